@@ -0,0 +1,70 @@
+"""
+Meet import- en opstarttijd van de app in een schoon proces.
+
+Per run wordt gemeten hoe lang `import src.ufc_app` en `create_app()` duren,
+welke zware modules daarbij al geladen zijn en het maximale RSS geheugen.
+Zware modules als bs4 en requests horen pas bij gebruik geladen te worden.
+
+Gebruik (vanuit de root van de repository):
+    python -m benchmarks.boot_time --runs 5 --output boot.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("bs4", "requests", "ufc_data_scraper", "urllib3")
+
+PROBE = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import src.ufc_app as package
+imported = time.perf_counter()
+app = package.create_app()
+created = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "loaded_heavy_modules": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def measure_once():
+    env = dict(os.environ, FLASK_DEBUG='1', UFC_SNAPSHOT_PATH='')
+    output = subprocess.check_output(
+        [sys.executable, "-c", PROBE.format(root=ROOT, heavy=HEAVY_MODULES)],
+        cwd=ROOT, env=env, stderr=subprocess.DEVNULL,
+    )
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Meet import- en opstarttijd van de UFC app")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="Schrijf de JSON resultaten naar dit bestand")
+    args = parser.parse_args(argv)
+
+    runs = [measure_once() for _ in range(args.runs)]
+    report = {
+        "runs": args.runs,
+        "import_ms_median": round(statistics.median(r["import_ms"] for r in runs), 2),
+        "create_app_ms_median": round(statistics.median(r["create_app_ms"] for r in runs), 2),
+        "max_rss_kb_median": statistics.median(r["max_rss_kb"] for r in runs),
+        "loaded_heavy_modules": runs[-1]["loaded_heavy_modules"],
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
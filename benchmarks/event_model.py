@@ -0,0 +1,102 @@
+"""
+Geheugen per gecacht event en rendertijd van de event endpoints.
+
+Scrapet (via de fake upstream) een aantal events door het normale cache pad
+en meet daarna voor de objecten zoals ze in de cache staan:
+- de diepe grootte in bytes (sys.getsizeof over de hele objectboom)
+- de gepickelde grootte (wat de sqlite/socket backends en het archief opslaan)
+- de tijd voor build_event_json, render_home_text en de wijzigingscheck
+  (een ongewijzigd event vergelijken met de cache)
+
+Gebruik (vanuit de root van de repository):
+    python -m benchmarks.event_model --card-size 14 --events 20
+"""
+import argparse
+from datetime import datetime
+import json
+import os
+import pickle
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import FakeUpstream  # noqa: E402
+from benchmarks.run_benchmarks import load_app  # noqa: E402
+
+
+def deep_sizeof(obj, seen=None):
+    """Grootte van een object inclusief alles wat het (uniek) bevat"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen or isinstance(obj, type):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif not isinstance(obj, (str, bytes, int, float, bool, datetime)) and obj is not None:
+        if hasattr(obj, '__dict__'):
+            size += deep_sizeof(vars(obj), seen)
+        for cls in type(obj).__mro__:
+            for slot in getattr(cls, '__slots__', ()):
+                if hasattr(obj, slot):
+                    size += deep_sizeof(getattr(obj, slot), seen)
+    return size
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 4)
+
+
+def run(args):
+    upstream = FakeUpstream(latency=0, card_size=args.card_size, in_progress=args.in_progress)
+    _, main = load_app(upstream)
+    main.live_probe.interval = 3600  # De probe hoort niet in de rendertijd
+
+    event_ids = list(range(2000, 2000 + args.events))
+    for event_id in event_ids:
+        main._scrape_and_store(event_id)
+    cached = [main.event_cache.get(event_id)[1] for event_id in event_ids]
+    event = cached[0]
+    # Zelfde inhoud, ander object: het gewone geval bij een verversing zonder wijzigingen
+    unchanged = pickle.loads(pickle.dumps(event))
+    main.get_event_with_cache(event_ids[0])  # Live probe snapshot aanmaken
+
+    seen = set()
+    total_deep = sum(deep_sizeof(e, seen) for e in cached)
+    return {
+        "model": type(event).__name__,
+        "card_size": args.card_size,
+        "events": len(cached),
+        "deep_bytes_per_event": round(total_deep / len(cached)),
+        "pickled_bytes_per_event": round(statistics.mean(
+            len(pickle.dumps(e, protocol=pickle.HIGHEST_PROTOCOL)) for e in cached)),
+        "build_event_json_ms": timed(lambda: main.build_event_json(event), args.repeat),
+        "render_home_text_ms": timed(lambda: main.render_home_text(event), args.repeat),
+        "scrape_to_cache_ms": timed(lambda: main._scrape_and_store(event_ids[0]), args.repeat),
+        "change_check_ms": timed(lambda: event == unchanged, args.repeat),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Geheugen en rendertijd van gecachte events")
+    parser.add_argument("--card-size", type=int, default=14, help="Aantal gevechten per event")
+    parser.add_argument("--events", type=int, default=12, help="Aantal events in de cache")
+    parser.add_argument("--repeat", type=int, default=200, help="Herhalingen per tijdmeting")
+    parser.add_argument("--in-progress", action="store_true", help="Gebruik een 'In Progress' kaart")
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args), indent=2))
+
+
+if __name__ == "__main__":
+    main()
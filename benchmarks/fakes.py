@@ -0,0 +1,209 @@
+"""
+Lokale stand-ins voor de upstream: de event scraper en de UFC.com events pagina.
+
+Latency, foutpercentage en kaartgrootte zijn instelbaar, zodat benchmarks
+reproduceerbaar zijn zonder ooit de echte upstream te raken.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import random
+import sys
+import threading
+import time
+import types
+
+import pytz
+import requests
+
+
+@dataclass(frozen=True)
+class FakeFighter:
+    name: str
+    url: str
+
+
+@dataclass(frozen=True)
+class FakeFighterStats:
+    fighter: FakeFighter
+
+
+@dataclass(frozen=True)
+class FakeResult:
+    method: str
+    ending_round: int
+    ending_time: str
+
+
+@dataclass(frozen=True)
+class FakeFight:
+    fighters_stats: tuple
+    result: object
+
+
+@dataclass(frozen=True)
+class FakeSegment:
+    name: str
+    start_time: datetime
+    fights: tuple
+
+
+@dataclass(frozen=True)
+class FakeEvent:
+    name: str
+    status: str
+    card_segments: tuple
+
+
+class UpstreamError(requests.ConnectionError):
+    """Gesimuleerde transportfout; telt voor de circuit breakers als upstream fout"""
+
+
+class FakeUpstream:
+    """Gesimuleerde upstream met tellers per soort aanroep"""
+
+    METHODS = ("KO/TKO", "Submission", "Decision - Unanimous", "Decision - Split")
+
+    def __init__(self, latency=0.05, failure_rate=0.0, card_size=12, in_progress=False, seed=1):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.card_size = card_size
+        self.in_progress = in_progress
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = {"scrape_event": 0, "events_page": 0, "fighter": 0, "failures": 0}
+
+    def _call(self, kind):
+        with self._lock:
+            self.calls[kind] += 1
+            fail = self._random.random() < self.failure_rate
+            if fail:
+                self.calls["failures"] += 1
+        time.sleep(self.latency)
+        if fail:
+            raise UpstreamError(f"Gesimuleerde upstream fout ({kind})")
+
+    def call_counts(self):
+        with self._lock:
+            return dict(self.calls)
+
+    def make_event(self, fmid):
+        """Deterministische kaart; met in_progress is de main card half afgewerkt"""
+        now = datetime.now(pytz.UTC)
+        segment_sizes = [max(1, self.card_size // 3), max(1, self.card_size // 3)]
+        segment_sizes.insert(0, max(1, self.card_size - sum(segment_sizes)))
+        names = ["Early Prelims", "Prelims", "Main Card"]
+        status = "In Progress" if self.in_progress else "Final"
+        segments = []
+        fight_no = 0
+        for s, (name, size) in enumerate(zip(names, segment_sizes)):
+            fights = []
+            for i in range(size):
+                fight_no += 1
+                done = not self.in_progress or s < 2 or i < size // 2
+                result = None
+                if done:
+                    result = FakeResult(self.METHODS[fight_no % len(self.METHODS)],
+                                        1 + fight_no % 3, f"{fight_no % 5}:{fight_no % 60:02d}")
+                fighters = tuple(
+                    FakeFighterStats(FakeFighter(f"Fighter {fmid}-{fight_no}{side}",
+                                                 f"https://www.ufc.com/athlete/fighter-{fmid}-{fight_no}{side.lower()}"))
+                    for side in ("A", "B")
+                )
+                fights.append(FakeFight(fighters, result))
+            start = now - timedelta(hours=3 - s) if self.in_progress else now - timedelta(days=7)
+            segments.append(FakeSegment(name, start, tuple(fights)))
+        return FakeEvent(f"UFC Fake {fmid}", status, tuple(segments))
+
+    def scrape_event_fmid(self, fmid):
+        self._call("scrape_event")
+        return self.make_event(fmid)
+
+    def scrape_event_url(self, url):
+        self._call("scrape_event")
+        return self.make_event(abs(hash(url)) % 10000)
+
+    def get_event_fmid(self, url):
+        self._call("scrape_event")
+        # De fake events pagina linkt naar /event/ufc-<fmid>
+        slug = url.rstrip("/").rsplit("/", 1)[-1]
+        digits = slug.rsplit("-", 1)[-1]
+        return int(digits) if digits.isdigit() else abs(hash(url)) % 10000
+
+    def scrape_fighter_url(self, url):
+        self._call("fighter")
+        return {"url": url, "name": url.rstrip("/").rsplit("/", 1)[-1]}
+
+    def events_page(self, past_events=40):
+        """
+        Events pagina met dezelfde kaartstructuur als UFC.com (event kaarten per
+        sectie), inclusief wat de echte pagina ook doet: <li> en <p> zonder
+        eindtag en "Live" in de navigatie
+        """
+        live = '<div class="c-card-event--result__live">LIVE NOW</div>' if self.in_progress else ""
+
+        def card(number, extra=""):
+            return (
+                f'<li class="l-listing__item"><article class="c-card-event--result">{extra}'
+                f'<h3 class="c-card-event--result__headline"><a href="/event/ufc-{number}">Fighter {number}A vs Fighter {number}B</a></h3>'
+                f'<div class="c-card-event--result__date"><a href="/event/ufc-{number}">Sat, Oct 17 / 10:00 PM</a></div>'
+                f'<div class="c-card-event--result__info"><p>UFC Apex, Las Vegas</div>'
+                f'<img src="/img/{number}.jpg"></article>'
+            )
+
+        upcoming = card(1251, live) + card(1252)
+        past = "".join(card(1250 - i) for i in range(past_events))
+        return (
+            "<html><head><script>var s = 'LIVE NOW';</script></head><body>"
+            "<nav><a href='/watch'>Watch Live Events</a></nav>"
+            f"<div id='events-list-upcoming'><ul>{upcoming}</ul></div>"
+            f"<div id='events-list-past'><ul>{past}</ul></div></body></html>"
+        )
+
+
+class FakeResponse:
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode('utf-8')
+        self.headers = headers or {}
+
+
+class FakeSession:
+    """Vervangt requests.Session van de live probe; ondersteunt If-None-Match"""
+
+    def __init__(self, upstream):
+        self.upstream = upstream
+
+    def get(self, url, headers=None, timeout=None, **kwargs):
+        self.upstream._call("events_page")
+        text = self.upstream.events_page()
+        etag = f'"{abs(hash(text))}"'
+        if headers and headers.get("If-None-Match") == etag:
+            return FakeResponse(304, headers={"ETag": etag})
+        return FakeResponse(200, text, {"ETag": etag})
+
+    def close(self):
+        pass
+
+
+def install_scraper_module(upstream):
+    """
+    Zorg dat `ufc_data_scraper.ufc_scraper` importeerbaar is. Als het echte
+    pakket niet geïnstalleerd is, wordt een module geregistreerd die naar de
+    fake upstream doorverwijst; de benchmark patcht de functies toch altijd.
+    """
+    try:
+        import ufc_data_scraper.ufc_scraper  # noqa: F401
+        return False
+    except ImportError:
+        pass
+    package = types.ModuleType("ufc_data_scraper")
+    module = types.ModuleType("ufc_data_scraper.ufc_scraper")
+    module.scrape_event_fmid = upstream.scrape_event_fmid
+    module.scrape_event_url = upstream.scrape_event_url
+    module.get_event_fmid = upstream.get_event_fmid
+    module.scrape_fighter_url = upstream.scrape_fighter_url
+    package.ufc_scraper = module
+    sys.modules["ufc_data_scraper"] = package
+    sys.modules["ufc_data_scraper.ufc_scraper"] = module
+    return True
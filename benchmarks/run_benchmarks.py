@@ -0,0 +1,263 @@
+"""
+Offline benchmark en load test voor de UFC app.
+
+De scraper en de UFC.com events pagina worden vervangen door lokale fakes
+(zie fakes.py) met instelbare latency, foutpercentage en kaartgrootte.
+Elk scenario stuurt gelijktijdige requests naar een endpoint via de Flask
+test client en meet p50/p90/p99 latency, requests per seconde en het aantal
+upstream aanroepen. De resultaten worden als JSON geschreven, zodat runs
+van verschillende commits vergeleken kunnen worden.
+
+Gebruik (vanuit de root van de repository):
+    python -m benchmarks.run_benchmarks --output bench.json
+    python -m benchmarks.run_benchmarks --in-progress --latency 0.2 --card-size 14
+    python -m benchmarks.run_benchmarks --scenario hits_during_slow_misses --slow-latency 3
+    python -m benchmarks.run_benchmarks --compare oud.json nieuw.json
+
+Het scenario hits_during_slow_misses laat zien dat cache hits snel blijven
+terwijl andere threads op een trage upstream wachten (zoals bij gunicorn
+gthread workers, zie gunicorn.conf.py).
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import FakeSession, FakeUpstream, install_scraper_module  # noqa: E402
+
+DEFAULT_SCENARIOS = [
+    # (naam, pad, cache eerst legen)
+    ("home_cold", "/", True),
+    ("home_warm", "/", False),
+    ("event_cold", "/event/1250", True),
+    ("event_warm", "/event/1251", False),
+    ("event_projected", "/event/1251?only=live,results&fields=fighters,result,status&segment=Main%20Card", False),
+    ("api_status", "/api/status", False),
+    ("card_fighters", "/event/1251/fighters", False),
+    ("fighter_warm", "/fighter/fighter-1251-1a?event=1251", False),
+]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def load_app(upstream, with_refresher=False):
+    """Importeer de app met fakes in plaats van de echte upstream"""
+    if not with_refresher:
+        os.environ['FLASK_DEBUG'] = '1'
+    # Geen warm start vanuit een eerdere run: elke benchmark begint koud
+    os.environ.setdefault('UFC_SNAPSHOT_PATH', '')
+    os.environ.setdefault('UFC_ARCHIVE_PATH', '')
+    install_scraper_module(upstream)
+    from src.ufc_app import app, main
+    main.scrape_event_fmid = upstream.scrape_event_fmid
+    main.scrape_fighter_url = upstream.scrape_fighter_url
+    main.get_event_fmid = upstream.get_event_fmid
+    main.live_probe.session = FakeSession(upstream)
+    return app, main
+
+
+def reset_caches(main):
+    """Leeg alle caches zodat een scenario koud start"""
+    for event_id, _ in main.event_cache.items():
+        main.event_cache.delete(event_id)
+    main.live_probe._snapshot = None
+
+
+def run_scenario(app, upstream, name, path, total, concurrency, headers=None):
+    local = threading.local()
+
+    def one_request(_):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        start = time.perf_counter()
+        response = client.get(path, headers=headers or {})
+        response.get_data()
+        return time.perf_counter() - start, response.status_code
+
+    calls_before = upstream.call_counts()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one_request, range(total)))
+    elapsed = time.perf_counter() - started
+    calls_after = upstream.call_counts()
+
+    latencies = sorted(s[0] * 1000 for s in samples)
+    statuses = {}
+    for _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    return {
+        "scenario": name,
+        "path": path,
+        "requests": total,
+        "concurrency": concurrency,
+        "elapsed_seconds": round(elapsed, 4),
+        "requests_per_second": round(total / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p90": round(percentile(latencies, 90), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(latencies[-1], 3),
+            "mean": round(statistics.mean(latencies), 3),
+        },
+        "status_codes": statuses,
+        "upstream_calls": {k: calls_after[k] - calls_before[k] for k in calls_after},
+    }
+
+
+def run_slow_upstream_scenario(app, main, upstream, args):
+    """
+    Meet cache hits op /event/1251 terwijl andere clients continu cache misses
+    veroorzaken tegen een trage upstream (en de live probe steeds verloopt).
+    """
+    name, path = "hits_during_slow_misses", "/event/1251"
+    fast_latency = upstream.latency
+    app.test_client().get(path)  # Warm de cache met de normale latency
+
+    upstream.latency = args.slow_latency
+    probe_interval = main.live_probe.interval
+    main.live_probe.interval = 0.1
+    stop = threading.Event()
+    counter = iter(range(100000, 10 ** 9))
+    counter_lock = threading.Lock()
+
+    def miss_loop():
+        client = app.test_client()
+        while not stop.is_set():
+            with counter_lock:
+                event_id = next(counter)
+            client.get(f"/event/{event_id}")
+
+    missers = [threading.Thread(target=miss_loop, daemon=True) for _ in range(max(1, args.concurrency // 2))]
+    for thread in missers:
+        thread.start()
+    time.sleep(0.2)  # Zorg dat de misses echt lopen
+    try:
+        result = run_scenario(app, upstream, name, path, args.requests, args.concurrency)
+    finally:
+        stop.set()
+        upstream.latency = fast_latency
+        main.live_probe.interval = probe_interval
+    result["slow_upstream_latency_seconds"] = args.slow_latency
+    result["concurrent_missing_clients"] = len(missers)
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def run(args):
+    upstream = FakeUpstream(
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+        card_size=args.card_size,
+        in_progress=args.in_progress,
+    )
+    app, main = load_app(upstream, with_refresher=args.with_refresher)
+
+    scenarios = DEFAULT_SCENARIOS
+    if args.scenario:
+        scenarios = [s for s in DEFAULT_SCENARIOS if s[0] in args.scenario]
+
+    results = []
+    for name, path, cold in scenarios:
+        if cold:
+            reset_caches(main)
+        else:
+            # Warme scenario's meten cache hits: ook als ze los (--scenario) draaien
+            app.test_client().get(path)
+        results.append(run_scenario(app, upstream, name, path, args.requests, args.concurrency))
+    if not args.scenario or "hits_during_slow_misses" in args.scenario:
+        results.append(run_slow_upstream_scenario(app, main, upstream, args))
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "python": platform.python_version(),
+            "parameters": {
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "latency": args.latency,
+                "failure_rate": args.failure_rate,
+                "card_size": args.card_size,
+                "in_progress": args.in_progress,
+                "with_refresher": args.with_refresher,
+                "slow_latency": args.slow_latency,
+            },
+        },
+        "results": results,
+    }
+
+
+def compare(old_path, new_path):
+    """Print de verandering per scenario tussen twee benchmark runs"""
+    with open(old_path) as f:
+        old = {r["scenario"]: r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = {r["scenario"]: r for r in json.load(f)["results"]}
+    rows = []
+    for name, result in new.items():
+        if name not in old:
+            continue
+        before = old[name]
+        row = {"scenario": name}
+        for key in ("p50", "p99"):
+            a, b = before["latency_ms"][key], result["latency_ms"][key]
+            row[f"{key}_ms"] = [a, b, round((b - a) / a * 100, 1) if a else None]
+        a, b = before["requests_per_second"], result["requests_per_second"]
+        row["requests_per_second"] = [a, b, round((b - a) / a * 100, 1) if a else None]
+        row["upstream_calls"] = [sum(before["upstream_calls"].values()), sum(result["upstream_calls"].values())]
+        rows.append(row)
+    return {"old": old_path, "new": new_path, "comparison": rows}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark voor de UFC app")
+    parser.add_argument("--requests", type=int, default=500, help="Aantal requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="Aantal gelijktijdige clients")
+    parser.add_argument("--latency", type=float, default=0.05, help="Upstream latency in seconden")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Kans op een upstream fout (0-1)")
+    parser.add_argument("--card-size", type=int, default=12, help="Aantal gevechten per event")
+    parser.add_argument("--slow-latency", type=float, default=2.0,
+                        help="Upstream latency tijdens het hits_during_slow_misses scenario")
+    parser.add_argument("--in-progress", action="store_true", help="Gebruik een 'In Progress' kaart")
+    parser.add_argument("--with-refresher", action="store_true", help="Laat de achtergrond verversing draaien")
+    parser.add_argument("--scenario", action="append", help="Draai alleen dit scenario (herhaalbaar)")
+    parser.add_argument("--output", help="Schrijf de JSON resultaten naar dit bestand")
+    parser.add_argument("--compare", nargs=2, metavar=("OUD", "NIEUW"), help="Vergelijk twee resultaatbestanden")
+    args = parser.parse_args(argv)
+
+    report = compare(*args.compare) if args.compare else run(args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Gunicorn configuratie voor productie.
+
+Standaard draaien we threaded workers (gthread): een trage upstream scrape of
+UFC.com probe houdt dan één thread bezet in plaats van een hele worker, en
+cache hits worden door de andere threads gewoon bediend. De app is hier veilig
+voor: de event cache, single-flight, live probe en change feed zijn allemaal
+thread-safe, en de achtergrond verversing draait per proces in één thread.
+
+Een open SSE stream of wachtende long-poll houdt een thread bezet. Met gthread
+mag daarom hoogstens de helft van de threads per worker streamen
+(UFC_MAX_STREAMS); daarboven krijgt een SSE client 503 met Retry-After en
+antwoordt een long-poll direct, zodat gewone requests altijd threads houden.
+Voor veel open SSE streams: GUNICORN_WORKER_CLASS=gevent (vereist
+`pip install gevent`). Gunicorn monkey-patcht dan threading en sockets, zodat
+locks, de worker pools en wachtende streams greenlets worden.
+
+Met meer dan één worker is een gedeelde cache nodig, anders draait elke
+worker een eigen verversing en live probe en scrapet hij in zijn eigen cache.
+Zonder expliciete UFC_CACHE_BACKEND kiest deze config dan sqlite; socket kan
+ook (zie cache_daemon.py).
+
+Met GUNICORN_PRELOAD=1 laadt de master de app (en de scraper) één keer vóór de
+fork; workers delen die geheugenpagina's via copy-on-write. De achtergrond
+threads starten pas in post_worker_init, dus na de fork in elke worker.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))  # alleen gevent
+
+# Meerdere workers: één gedeelde cache, met één leader die ververst
+if workers > 1:
+    os.environ.setdefault('UFC_CACHE_BACKEND', 'sqlite')
+
+# Streams per worker begrenzen: met threads zijn dat threads, met gevent greenlets
+if worker_class in ('gevent', 'eventlet'):
+    os.environ.setdefault('UFC_MAX_STREAMS', str(worker_connections // 2))
+else:
+    os.environ.setdefault('UFC_MAX_STREAMS', str(threads // 2))
+
+# Trage scrapes mogen een thread blokkeren, niet de hele worker laten herstarten
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', '0') == '1'
+if preload_app:
+    # Laat create_app() de scraper vóór de fork importeren
+    os.environ.setdefault('UFC_EAGER_IMPORTS', '1')
+
+
+def post_worker_init(worker):
+    """Start de achtergrond verversing in de worker, na de fork"""
+    from src.ufc_app.main import start_background_services
+    start_background_services()
@@ -1,6 +1,8 @@
-from src.ufc_app import app
+from src.ufc_app import create_app
 import os
 
+app = create_app()
+
 # Alleen als dit script direct wordt uitgevoerd
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
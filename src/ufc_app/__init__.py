@@ -1,12 +1,45 @@
-from flask import Flask, jsonify
-from ufc_data_scraper.ufc_scraper import (
-    get_event_fmid,
-    scrape_fighter_url,
-    scrape_event_url,
-    scrape_event_fmid,
-)
-
-app = Flask(__name__)
-
-# Import routes
-from . import main
+import logging
+import os
+import time
+
+from flask import Flask
+
+logger = logging.getLogger('ufc_app')
+
+_app = None
+
+
+def create_app():
+    """
+    Maak de Flask app. Er draaien hier geen threads: de achtergrond verversing
+    start pas na de fork (gunicorn post_worker_init, zie gunicorn.conf.py) of
+    anders bij het eerste request, zodat `gunicorn --preload` veilig is.
+    """
+    start = time.perf_counter()
+    app = Flask(__name__)
+
+    # Import routes
+    from . import main
+    app.register_blueprint(main.bp)
+
+    # Warm start vanuit de snapshot; bij --preload gedeeld via copy-on-write
+    main.load_cache_snapshot()
+
+    # Met --preload de scraper vóór de fork importeren, zodat workers die pagina's delen
+    if os.environ.get('UFC_EAGER_IMPORTS'):
+        import ufc_data_scraper.ufc_scraper  # noqa: F401
+
+    app.before_first_request(main.start_background_services)
+
+    logger.info(f"App aangemaakt in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return app
+
+
+def __getattr__(name):
+    # Achterwaartse compatibiliteit: `from src.ufc_app import app`
+    global _app
+    if name == 'app':
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(name)
@@ -0,0 +1,299 @@
+"""
+Lokaal historisch archief van events in sqlite.
+
+Elk gearchiveerd event wordt opgeslagen als gepickled object (om /event/<id>
+zonder scrape te kunnen serveren) plus genormaliseerde rijen per gevecht en
+per fighter, met indexes op fighter, methode, ronde en datum. Een content
+hash per event zorgt ervoor dat alleen nieuwe of gewijzigde events herschreven
+worden; afgeronde ('Final') events worden bij een sync niet opnieuw opgehaald.
+
+Backfill en sync (vanuit de root van de repository):
+    python -m src.ufc_app.archive backfill 1200 1260 --workers 4
+    python -m src.ufc_app.archive sync --ahead 5
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+
+from .fighters import fighter_slug
+from .snapshot import to_snapshot
+from .storage import check_private_sqlite, default_path
+
+logger = logging.getLogger('ufc_app')
+
+FINAL_STATUS = "Final"
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS events ("
+    " event_id INTEGER PRIMARY KEY, name TEXT, status TEXT, event_date TEXT,"
+    " content_hash TEXT NOT NULL, fetched_at REAL NOT NULL, payload BLOB NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS fights ("
+    " fight_id INTEGER PRIMARY KEY, event_id INTEGER NOT NULL, event_date TEXT,"
+    " segment TEXT, segment_order INTEGER, position INTEGER, fighters TEXT,"
+    " method TEXT, ending_round INTEGER, ending_time TEXT)",
+    "CREATE TABLE IF NOT EXISTS fight_fighters ("
+    " fight_id INTEGER NOT NULL, event_id INTEGER NOT NULL, slug TEXT NOT NULL,"
+    " name TEXT, corner INTEGER)",
+    "CREATE INDEX IF NOT EXISTS idx_events_date ON events (event_date)",
+    "CREATE INDEX IF NOT EXISTS idx_fights_event ON fights (event_id)",
+    "CREATE INDEX IF NOT EXISTS idx_fights_method ON fights (method, event_date)",
+    "CREATE INDEX IF NOT EXISTS idx_fights_round ON fights (ending_round, event_date)",
+    "CREATE INDEX IF NOT EXISTS idx_fights_date ON fights (event_date)",
+    "CREATE INDEX IF NOT EXISTS idx_fight_fighters_slug ON fight_fighters (slug)",
+    "CREATE INDEX IF NOT EXISTS idx_fight_fighters_event ON fight_fighters (event_id)",
+)
+
+
+def _ending_round(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def event_rows(event):
+    """Genormaliseerde (segment, volgorde, positie, namen, methode, ronde, tijd) rijen van een event"""
+    rows = []
+    for segment_order, segment in enumerate(event.card_segments):
+        for position, fight in enumerate(segment.fights):
+            names = list(fight.fighter_names)
+            result = fight.result if fight.result and fight.result.method else None
+            rows.append((
+                segment.name, segment_order, position, names,
+                result.method if result else None,
+                _ending_round(result.ending_round) if result else None,
+                str(result.ending_time) if result else None,
+            ))
+    return rows
+
+
+def event_date(event):
+    """Starttijd van het eerste segment (ISO), of None als die onbekend is"""
+    starts = [s.start_time for s in event.card_segments if s.start_time]
+    return min(starts).isoformat() if starts else None
+
+
+class EventArchive:
+    """sqlite archief (WAL) met een connectie per thread, opnieuw geopend na een fork"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        with conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+        # De payloads worden ge-unpickled: alleen een eigen, privé bestand gebruiken
+        check_private_sqlite(path)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def store_event(self, event_id, event):
+        """Archiveer een event; geeft False terug als de inhoud niet veranderd is"""
+        event = to_snapshot(event)
+        digest = event.content_hash
+        conn = self._conn()
+        row = conn.execute("SELECT content_hash FROM events WHERE event_id = ?", (event_id,)).fetchone()
+        if row is not None and row[0] == digest:
+            conn.execute("UPDATE events SET fetched_at = ? WHERE event_id = ?", (time.time(), event_id))
+            return False
+        rows = event_rows(event)
+        date = event_date(event)
+        payload = zlib.compress(pickle.dumps(event, protocol=pickle.HIGHEST_PROTOCOL), 6)
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO events"
+                " (event_id, name, status, event_date, content_hash, fetched_at, payload)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (event_id, event.name, event.status, date, digest, time.time(), payload),
+            )
+            conn.execute("DELETE FROM fight_fighters WHERE event_id = ?", (event_id,))
+            conn.execute("DELETE FROM fights WHERE event_id = ?", (event_id,))
+            for segment, segment_order, position, names, method, ending_round, ending_time in rows:
+                cursor = conn.execute(
+                    "INSERT INTO fights (event_id, event_date, segment, segment_order, position,"
+                    " fighters, method, ending_round, ending_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (event_id, date, segment, segment_order, position, json.dumps(names),
+                     method, ending_round, ending_time),
+                )
+                conn.executemany(
+                    "INSERT INTO fight_fighters (fight_id, event_id, slug, name, corner) VALUES (?, ?, ?, ?, ?)",
+                    [(cursor.lastrowid, event_id, fighter_slug(name), name, corner)
+                     for corner, name in enumerate(names)],
+                )
+        return True
+
+    def load_event(self, event_id):
+        """Het gearchiveerde event object, of None"""
+        row = self._conn().execute("SELECT payload FROM events WHERE event_id = ?", (event_id,)).fetchone()
+        if row is None:
+            return None
+        return pickle.loads(zlib.decompress(row[0]))
+
+    def needs_sync(self, event_id):
+        """Nog niet gearchiveerd, of nog niet afgerond (en dus mogelijk veranderd)"""
+        row = self._conn().execute("SELECT status FROM events WHERE event_id = ?", (event_id,)).fetchone()
+        return row is None or row[0] != FINAL_STATUS
+
+    def open_event_ids(self):
+        """Gearchiveerde events die nog niet afgerond zijn"""
+        rows = self._conn().execute(
+            "SELECT event_id FROM events WHERE status IS NOT ? ORDER BY event_id", (FINAL_STATUS,))
+        return [row[0] for row in rows]
+
+    def max_event_id(self):
+        row = self._conn().execute("SELECT MAX(event_id) FROM events").fetchone()
+        return row[0]
+
+    @staticmethod
+    def _fight_dict(row):
+        return {
+            "event_id": row["event_id"],
+            "event_name": row["event_name"],
+            "event_date": row["event_date"],
+            "segment": row["segment"],
+            "position": row["position"],
+            "fighters": json.loads(row["fighters"]),
+            "method": row["method"],
+            "ending_round": row["ending_round"],
+            "ending_time": row["ending_time"],
+        }
+
+    def finishes(self, method=None, ending_round=None, last_events=None, limit=100):
+        """
+        Gevechten die niet op beslissing eindigden, nieuwste eerst. `method` is een
+        prefix (bv. 'KO' of 'Submission'); `last_events` beperkt tot de laatste N events.
+        """
+        where = ["f.method IS NOT NULL", "f.method NOT LIKE 'Decision%'"]
+        params = []
+        if method:
+            where.append("f.method LIKE ?")
+            params.append(method + "%")
+        if ending_round is not None:
+            where.append("f.ending_round = ?")
+            params.append(ending_round)
+        if last_events:
+            where.append("f.event_id IN (SELECT event_id FROM events ORDER BY event_date DESC, event_id DESC LIMIT ?)")
+            params.append(last_events)
+        params.append(limit)
+        rows = self._conn().execute(
+            "SELECT f.*, e.name AS event_name FROM fights f JOIN events e ON e.event_id = f.event_id"
+            f" WHERE {' AND '.join(where)}"
+            " ORDER BY f.event_date DESC, f.event_id DESC, f.segment_order DESC, f.position LIMIT ?",
+            params,
+        )
+        return [self._fight_dict(row) for row in rows]
+
+    def fighter_fights(self, name_or_slug, limit=200):
+        """Alle gearchiveerde gevechten van een fighter, nieuwste eerst"""
+        rows = self._conn().execute(
+            "SELECT f.*, e.name AS event_name FROM fight_fighters ff"
+            " JOIN fights f ON f.fight_id = ff.fight_id JOIN events e ON e.event_id = f.event_id"
+            " WHERE ff.slug = ? ORDER BY f.event_date DESC, f.event_id DESC LIMIT ?",
+            (fighter_slug(name_or_slug), limit),
+        )
+        return [self._fight_dict(row) for row in rows]
+
+    def stats(self):
+        conn = self._conn()
+        events, first, last = conn.execute(
+            "SELECT COUNT(*), MIN(event_id), MAX(event_id) FROM events").fetchone()
+        fights = conn.execute("SELECT COUNT(*) FROM fights").fetchone()[0]
+        return {
+            "path": self.path,
+            "events": events,
+            "fights": fights,
+            "open_events": len(self.open_event_ids()),
+            "event_id_range": [first, last] if events else None,
+        }
+
+
+def backfill(archive, event_ids, scrape, workers=4, refresh=False):
+    """
+    Haal events op met hoogstens `workers` gelijktijdige scrapes en archiveer ze.
+    Zonder `refresh` worden al gearchiveerde, afgeronde events overgeslagen.
+    """
+    event_ids = list(event_ids)
+    todo = [event_id for event_id in event_ids if refresh or archive.needs_sync(event_id)]
+    summary = {"checked": len(event_ids), "fetched": 0, "stored": 0, "unchanged": 0, "errors": {}}
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='ufc-archive') as pool:
+        futures = {pool.submit(scrape, event_id): event_id for event_id in todo}
+        for future in as_completed(futures):
+            event_id = futures[future]
+            try:
+                event = future.result()
+            except Exception as e:
+                summary["errors"][event_id] = str(e)
+                continue
+            summary["fetched"] += 1
+            if archive.store_event(event_id, event):
+                summary["stored"] += 1
+            else:
+                summary["unchanged"] += 1
+    summary["seconds"] = round(time.perf_counter() - started, 2)
+    return summary
+
+
+def sync(archive, scrape, ahead=5, workers=4):
+    """Incrementele sync: open events opnieuw, plus `ahead` IDs na het hoogste gearchiveerde event"""
+    highest = archive.max_event_id()
+    if highest is None:
+        return {"checked": 0, "fetched": 0, "stored": 0, "unchanged": 0, "errors": {}, "seconds": 0.0}
+    event_ids = archive.open_event_ids() + list(range(highest + 1, highest + 1 + ahead))
+    return backfill(archive, event_ids, scrape, workers=workers)
+
+
+def _scrape_event_fmid(event_fmid):
+    from ufc_data_scraper.ufc_scraper import scrape_event_fmid
+    return scrape_event_fmid(event_fmid)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Historisch event archief voor de UFC app")
+    parser.add_argument("--path", default=os.environ.get('UFC_ARCHIVE_PATH') or default_path('archive.sqlite3'),
+                        help="sqlite bestand van het archief")
+    parser.add_argument("--workers", type=int, default=4, help="Maximaal aantal gelijktijdige scrapes")
+    commands = parser.add_subparsers(dest="command", required=True)
+    fill = commands.add_parser("backfill", help="Archiveer een reeks event fmids")
+    fill.add_argument("start", type=int)
+    fill.add_argument("end", type=int, help="Laatste fmid (inclusief)")
+    fill.add_argument("--refresh", action="store_true", help="Ook afgeronde events opnieuw ophalen")
+    incremental = commands.add_parser("sync", help="Ververs open events en zoek nieuwe")
+    incremental.add_argument("--ahead", type=int, default=5, help="Aantal fmids na het hoogste om te proberen")
+    commands.add_parser("stats", help="Toon de inhoud van het archief")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    archive = EventArchive(args.path)
+    if args.command == "backfill":
+        summary = backfill(archive, range(args.start, args.end + 1), _scrape_event_fmid,
+                           workers=args.workers, refresh=args.refresh)
+    elif args.command == "sync":
+        summary = sync(archive, _scrape_event_fmid, ahead=args.ahead, workers=args.workers)
+    else:
+        summary = archive.stats()
+    json.dump(summary, sys.stdout, indent=2, default=str)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,598 @@
+"""
+Verwisselbare opslag voor de event cache.
+
+- MemoryCacheBackend: dict binnen één proces (standaard)
+- SqliteCacheBackend: gedeeld bestand, bruikbaar voor alle gunicorn workers op één machine
+- SocketCacheBackend: client voor de lokale cache daemon (zie cache_daemon.py)
+
+Alle backends slaan per event ID een (fetched_at, event) paar op en kunnen
+bijhouden welke events recent opgevraagd zijn en welk proces een verversing
+geclaimd heeft, zodat meerdere workers niet hetzelfde event gaan scrapen.
+"""
+from collections import OrderedDict
+from datetime import datetime
+import logging
+import os
+import pickle
+import socket
+import sqlite3
+import struct
+import threading
+import time
+
+from .storage import UnsafeFileError, check_private, check_private_sqlite, env_path
+
+logger = logging.getLogger('ufc_app')
+
+DEFAULT_MAX_ENTRIES = 16
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+
+def estimate_size(event):
+    """Geschatte grootte van een event in bytes (lengte van de pickle)"""
+    try:
+        return len(pickle.dumps(event, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+
+class MemoryCacheBackend:
+    """
+    Cache in het geheugen van het huidige proces, met LRU volgorde.
+
+    Een OrderedDict houdt de volgorde van gebruik bij: een hit verplaatst de
+    entry naar achteren en eviction haalt aan de voorkant weg, beide O(1).
+    Gepinde event IDs (huidig/volgend event) worden nooit verwijderd.
+    """
+
+    shared = False
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()  # event_id -> (fetched_at, event, size)
+        self._bytes = 0
+        self._pinned = frozenset()
+        self._requested = {}
+        self._claims = {}
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+
+    def get(self, event_id):
+        with self._lock:
+            entry = self._data.get(event_id)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._data.move_to_end(event_id)
+            self._stats["hits"] += 1
+            return entry[0], entry[1]
+
+    def set(self, event_id, fetched_at, event):
+        size = estimate_size(event)
+        with self._lock:
+            previous = self._data.pop(event_id, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._data[event_id] = (fetched_at, event, size)
+            self._bytes += size
+            self._evict()
+
+    def _evict(self):
+        """Verwijder de minst recent gebruikte, niet gepinde entries tot we binnen de limieten zitten"""
+        skipped = []
+        while self._data and self._over_limit(len(self._data) + len(skipped)):
+            event_id, entry = self._data.popitem(last=False)
+            if event_id in self._pinned:
+                skipped.append((event_id, entry))
+                continue
+            self._bytes -= entry[2]
+            self._stats["evictions"] += 1
+        # Gepinde entries terugzetten aan de voorkant, in hun oude volgorde
+        for event_id, entry in reversed(skipped):
+            self._data[event_id] = entry
+            self._data.move_to_end(event_id, last=False)
+
+    def _over_limit(self, entries):
+        if self.max_entries and entries > self.max_entries:
+            return True
+        return bool(self.max_bytes) and self._bytes > self.max_bytes
+
+    def set_pinned(self, event_ids):
+        with self._lock:
+            self._pinned = frozenset(event_ids)
+
+    def delete(self, event_id):
+        with self._lock:
+            entry = self._data.pop(event_id, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+
+    def items(self):
+        with self._lock:
+            return [(k, (v[0], v[1])) for k, v in self._data.items()]
+
+    def versions(self):
+        """(event_id, fetched_at) per entry, zonder de events zelf"""
+        with self._lock:
+            return [(k, v[0]) for k, v in self._data.items()]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(
+                entries=len(self._data),
+                max_entries=self.max_entries,
+                estimated_bytes=self._bytes,
+                max_bytes=self.max_bytes,
+                pinned=sorted(self._pinned),
+                entry_bytes={str(k): v[2] for k, v in self._data.items()},
+            )
+            return stats
+
+    def mark_requested(self, event_id, timestamp):
+        with self._lock:
+            self._requested[event_id] = timestamp
+
+    def requested_since(self, cutoff):
+        """Event IDs die na `cutoff` opgevraagd zijn, meest recente eerst"""
+        with self._lock:
+            for event_id in [k for k, t in self._requested.items() if t < cutoff]:
+                del self._requested[event_id]
+            return sorted(self._requested, key=self._requested.get, reverse=True)
+
+    def claim_refresh(self, event_id, ttl):
+        """Claim een verversing voor `ttl` seconden; False als iemand anders bezig is"""
+        now = time.time()
+        with self._lock:
+            if self._claims.get(event_id, 0) > now:
+                return False
+            self._claims[event_id] = now + ttl
+            return True
+
+    def release_refresh(self, event_id):
+        with self._lock:
+            self._claims.pop(event_id, None)
+
+
+class DecodedEvents:
+    """
+    Per proces het laatst gedecodeerde event per ID, samen met de fetched_at
+    waarvoor het geldt. Zo levert een ongewijzigde entry steeds hetzelfde object
+    op (en blijven live-index en response cache geldig) zonder opnieuw te
+    unpicklen. Begrensd als LRU, want entries die een ander proces uit de
+    gedeelde cache verwijdert zien we hier niet.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries or DEFAULT_MAX_ENTRIES
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, event_id):
+        """(fetched_at, event) of None"""
+        with self._lock:
+            cached = self._entries.get(event_id)
+            if cached is not None:
+                self._entries.move_to_end(event_id)
+            return cached
+
+    def put(self, event_id, fetched_at, event):
+        with self._lock:
+            self._entries[event_id] = (fetched_at, event)
+            self._entries.move_to_end(event_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def decode(self, event_id, fetched_at, payload):
+        """Het event uit `payload`, of het eerder gedecodeerde object als fetched_at gelijk is"""
+        cached = self.get(event_id)
+        if cached and cached[0] == fetched_at:
+            return cached[1]
+        event = pickle.loads(payload)
+        self.put(event_id, fetched_at, event)
+        return event
+
+    def discard(self, event_ids):
+        with self._lock:
+            for event_id in event_ids:
+                self._entries.pop(event_id, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SqliteCacheBackend:
+    """
+    Gedeelde cache in een sqlite bestand (WAL modus). Events worden gepickled;
+    per proces wordt het laatst gedecodeerde event per ID bewaard zodat een
+    cache hit alleen een kleine SELECT kost als de data niet veranderd is.
+    """
+
+    shared = True
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._pinned = frozenset()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._local = threading.local()
+        self._decoded = DecodedEvents(max_entries)
+        self._stats_lock = threading.Lock()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS event_cache ("
+                " event_id INTEGER PRIMARY KEY, fetched_at REAL NOT NULL, payload BLOB NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS event_requests ("
+                " event_id INTEGER PRIMARY KEY, requested_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS refresh_claims ("
+                " event_id INTEGER PRIMARY KEY, claimed_until REAL NOT NULL)"
+            )
+        # Events worden ge-unpickled: alleen een eigen, privé bestand gebruiken
+        check_private_sqlite(path)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            # Nieuwe connectie per thread, en opnieuw na een fork
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def get(self, event_id):
+        conn = self._conn()
+        cached = self._decoded.get(event_id)
+        if cached:
+            # Alleen de timestamp ophalen; payload alleen als die veranderd is
+            row = conn.execute(
+                "SELECT fetched_at FROM event_cache WHERE event_id = ?", (event_id,)
+            ).fetchone()
+            if row is None:
+                self._decoded.discard((event_id,))
+                self._count("misses")
+                return None
+            if row[0] == cached[0]:
+                self._count("hits")
+                return datetime.fromtimestamp(row[0]), cached[1]
+        row = conn.execute(
+            "SELECT fetched_at, payload FROM event_cache WHERE event_id = ?", (event_id,)
+        ).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return datetime.fromtimestamp(row[0]), self._decoded.decode(event_id, row[0], row[1])
+
+    def set(self, event_id, fetched_at, event):
+        timestamp = fetched_at.timestamp()
+        payload = pickle.dumps(event, protocol=pickle.HIGHEST_PROTOCOL)
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO event_cache (event_id, fetched_at, payload) VALUES (?, ?, ?)",
+                (event_id, timestamp, payload),
+            )
+            evicted = self._evict(conn)
+        self._decoded.put(event_id, timestamp, event)
+        # Verwijderde entries ook uit het geheugen van dit proces halen
+        self._decoded.discard(evicted)
+
+    def _evict(self, conn):
+        """
+        Verwijder de oudste niet-gepinde entries tot we binnen de limieten zitten.
+        Gedeelde sqlite entries worden op ophaaltijd verwijderd: een LRU volgorde
+        bijhouden zou bij elke hit een schrijfactie over processen heen kosten.
+        Geeft de verwijderde event IDs terug.
+        """
+        rows = conn.execute(
+            "SELECT event_id, length(payload) FROM event_cache ORDER BY fetched_at DESC"
+        ).fetchall()
+        # Gepinde entries tellen altijd mee en worden nooit verwijderd
+        pinned = [size for event_id, size in rows if event_id in self._pinned]
+        entries, total, evict = len(pinned), sum(pinned), []
+        for event_id, size in rows:
+            if event_id in self._pinned:
+                continue
+            if (self.max_entries and entries + 1 > self.max_entries) or \
+                    (self.max_bytes and total + size > self.max_bytes):
+                evict.append((event_id,))
+                continue
+            entries += 1
+            total += size
+        if evict:
+            conn.executemany("DELETE FROM event_cache WHERE event_id = ?", evict)
+            self._count("evictions", len(evict))
+        return [event_id for (event_id,) in evict]
+
+    def set_pinned(self, event_ids):
+        self._pinned = frozenset(event_ids)
+
+    def delete(self, event_id):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM event_cache WHERE event_id = ?", (event_id,))
+        self._decoded.discard((event_id,))
+
+    def stats(self):
+        rows = self._conn().execute("SELECT event_id, length(payload) FROM event_cache").fetchall()
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats.update(
+            decoded_entries=len(self._decoded),
+            entries=len(rows),
+            max_entries=self.max_entries,
+            estimated_bytes=sum(size for _, size in rows),
+            max_bytes=self.max_bytes,
+            pinned=sorted(self._pinned),
+            entry_bytes={str(k): size for k, size in rows},
+        )
+        return stats
+
+    def items(self):
+        rows = self._conn().execute(
+            "SELECT event_id, fetched_at, payload FROM event_cache"
+        ).fetchall()
+        return [
+            (event_id, (datetime.fromtimestamp(ts), self._decoded.decode(event_id, ts, payload)))
+            for event_id, ts, payload in rows
+        ]
+
+    def versions(self):
+        """(event_id, fetched_at) per entry; leest en decodeert geen payloads"""
+        rows = self._conn().execute("SELECT event_id, fetched_at FROM event_cache").fetchall()
+        return [(event_id, datetime.fromtimestamp(ts)) for event_id, ts in rows]
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM event_cache").fetchone()[0]
+
+    def mark_requested(self, event_id, timestamp):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO event_requests (event_id, requested_at) VALUES (?, ?)",
+                (event_id, timestamp),
+            )
+
+    def requested_since(self, cutoff):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM event_requests WHERE requested_at < ?", (cutoff,))
+        return [row[0] for row in conn.execute(
+            "SELECT event_id FROM event_requests ORDER BY requested_at DESC")]
+
+    def claim_refresh(self, event_id, ttl):
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT claimed_until FROM refresh_claims WHERE event_id = ?", (event_id,)
+            ).fetchone()
+            if row and row[0] > now:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO refresh_claims (event_id, claimed_until) VALUES (?, ?)",
+                (event_id, now + ttl),
+            )
+            return True
+
+    def release_refresh(self, event_id):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM refresh_claims WHERE event_id = ?", (event_id,))
+
+
+# Berichten naar de daemon: 4 bytes lengte + gepickelde (operatie, argumenten)
+def send_message(sock, message):
+    payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    sock.sendall(struct.pack('!I', len(payload)) + payload)
+
+
+def recv_message(sock):
+    header = _recv_exact(sock, 4)
+    if header is None:
+        return None
+    (length,) = struct.unpack('!I', header)
+    payload = _recv_exact(sock, length)
+    if payload is None:
+        return None
+    return pickle.loads(payload)
+
+
+def _recv_exact(sock, length):
+    chunks = []
+    while length:
+        chunk = sock.recv(length)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        length -= len(chunk)
+    return b''.join(chunks)
+
+
+_UNAVAILABLE = object()
+
+
+class SocketCacheBackend:
+    """
+    Client voor de lokale cache daemon via een Unix socket. Alleen bedoeld voor
+    lokaal gebruik: de daemon vertrouwt (pickle) berichten van de socket.
+
+    Is de daemon (even) niet bereikbaar, dan degradeert de client in plaats van
+    requests te laten falen: get() is een miss (of de laatst bekende lokale
+    kopie), schrijfacties worden overgeslagen en claim_refresh staat de
+    verversing toe. De gepinde IDs worden na elke nieuwe verbinding opnieuw
+    gestuurd, zodat ook een herstarte daemon ze kent.
+    """
+
+    shared = True
+
+    def __init__(self, address, timeout=2, max_entries=DEFAULT_MAX_ENTRIES):
+        self.address = address
+        self.timeout = timeout
+        self._local = threading.local()
+        self._pinned = frozenset()
+        self._decoded = DecodedEvents(max_entries)
+        self.available = None  # Onbekend tot de eerste aanroep
+        self._state_lock = threading.Lock()
+        self.failures = 0
+
+    def _sock(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is None or getattr(self._local, 'pid', None) != os.getpid():
+            # Antwoorden worden ge-unpickled: alleen met een socket van deze gebruiker praten
+            check_private(self.address)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.address)
+                # Een (herstarte) daemon kent onze gepinde IDs nog niet
+                self._request(sock, 'set_pinned', list(self._pinned))
+            except BaseException:
+                sock.close()
+                raise
+            self._local.sock = sock
+            self._local.pid = os.getpid()
+        return sock
+
+    @staticmethod
+    def _request(sock, op, *args):
+        send_message(sock, (op, args))
+        reply = recv_message(sock)
+        if reply is None:
+            raise ConnectionError("Cache daemon heeft de verbinding gesloten")
+        return reply
+
+    def _call(self, op, *args):
+        try:
+            reply = self._request(self._sock(), op, *args)
+        except OSError:
+            self._local.sock = None
+            raise
+        ok, value = reply
+        if not ok:
+            raise RuntimeError(value)
+        return value
+
+    def _set_available(self, available, error=None):
+        with self._state_lock:
+            changed = available != self.available
+            self.available = available
+            if not available:
+                self.failures += 1
+        if changed and not available:
+            logger.warning(f"Cache daemon {self.address} niet bereikbaar ({error}); cache misses tot hij terug is")
+        elif changed and available:
+            logger.info(f"Cache daemon {self.address} bereikbaar")
+
+    def _try(self, op, *args):
+        """Zoals _call, maar _UNAVAILABLE als de daemon niet bereikbaar is"""
+        try:
+            value = self._call(op, *args)
+        except OSError as e:  # Ook ConnectionError, socket.timeout en UnsafeFileError
+            self._set_available(False, str(e))
+            return _UNAVAILABLE
+        if not self.available:
+            self._set_available(True)
+        return value
+
+    def get(self, event_id):
+        # Alleen de timestamp als het event niet veranderd is: geen overdracht, en
+        # hetzelfde object als vorige keer (zodat de live-index geldig blijft)
+        known = self._decoded.get(event_id)
+        reply = self._try('get_if_changed', event_id, known[0] if known else None)
+        if reply is _UNAVAILABLE:
+            return known
+        if reply is None:
+            self._decoded.discard((event_id,))
+            return None
+        fetched_at, event = reply
+        if event is None:
+            return known
+        self._decoded.put(event_id, fetched_at, event)
+        return fetched_at, event
+
+    def set(self, event_id, fetched_at, event):
+        self._decoded.put(event_id, fetched_at, event)
+        self._try('set', event_id, fetched_at, event)
+
+    def delete(self, event_id):
+        self._decoded.discard((event_id,))
+        self._try('delete', event_id)
+
+    def items(self):
+        items = self._try('items')
+        return [] if items is _UNAVAILABLE else items
+
+    def versions(self):
+        versions = self._try('versions')
+        return [] if versions is _UNAVAILABLE else versions
+
+    def __len__(self):
+        length = self._try('len')
+        return 0 if length is _UNAVAILABLE else length
+
+    def set_pinned(self, event_ids):
+        # Lokaal bewaren; wordt bij elke nieuwe verbinding opnieuw gestuurd
+        self._pinned = frozenset(event_ids)
+        self._try('set_pinned', list(self._pinned))
+
+    def stats(self):
+        stats = self._try('stats')
+        if stats is _UNAVAILABLE:
+            stats = {"pinned": sorted(self._pinned)}
+        return dict(stats, daemon_available=self.available, daemon_failures=self.failures,
+                    decoded_entries=len(self._decoded))
+
+    def mark_requested(self, event_id, timestamp):
+        self._try('mark_requested', event_id, timestamp)
+
+    def requested_since(self, cutoff):
+        ids = self._try('requested_since', cutoff)
+        return [] if ids is _UNAVAILABLE else ids
+
+    def claim_refresh(self, event_id, ttl):
+        # Zonder daemon geen coördinatie: dan ververst deze worker zelf
+        claimed = self._try('claim_refresh', event_id, ttl)
+        return True if claimed is _UNAVAILABLE else claimed
+
+    def release_refresh(self, event_id):
+        self._try('release_refresh', event_id)
+
+
+def make_cache_backend():
+    """Kies de cache backend op basis van UFC_CACHE_BACKEND (memory, sqlite of socket)"""
+    kind = os.environ.get('UFC_CACHE_BACKEND', 'memory').lower()
+    max_entries = int(os.environ.get('UFC_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+    max_bytes = int(os.environ.get('UFC_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+    if kind == 'sqlite':
+        path = env_path('UFC_CACHE_PATH', 'event_cache.sqlite3')
+        logger.info(f"Gedeelde sqlite cache backend: {path}")
+        try:
+            return SqliteCacheBackend(path, max_entries=max_entries, max_bytes=max_bytes)
+        except UnsafeFileError as e:
+            logger.error(f"sqlite cache niet gebruikt: {str(e)}; terugval op de geheugen cache")
+            return MemoryCacheBackend(max_entries=max_entries, max_bytes=max_bytes)
+    if kind == 'socket':
+        address = env_path('UFC_CACHE_SOCKET', 'event_cache.sock')
+        logger.info(f"Cache daemon backend: {address}")
+        return SocketCacheBackend(address, max_entries=max_entries)
+    return MemoryCacheBackend(max_entries=max_entries, max_bytes=max_bytes)
@@ -0,0 +1,107 @@
+"""
+Lokale cache daemon voor gunicorn deployments met meerdere workers.
+
+Start met:
+    python -m src.ufc_app.cache_daemon [pad]
+
+en zet in de workers UFC_CACHE_BACKEND=socket (en UFC_CACHE_SOCKET naar hetzelfde
+pad als dat afwijkt van de standaard ~/.cache/ufc_app/event_cache.sock).
+"""
+import logging
+import os
+import socket
+import socketserver
+import struct
+import sys
+
+from .cache_backends import (
+    DEFAULT_MAX_BYTES, DEFAULT_MAX_ENTRIES, MemoryCacheBackend, recv_message, send_message,
+)
+from .storage import env_path
+
+logger = logging.getLogger('ufc_app')
+
+OPERATIONS = {
+    'get', 'get_if_changed', 'set', 'delete', 'items', 'versions', 'len', 'set_pinned', 'stats',
+    'mark_requested', 'requested_since', 'claim_refresh', 'release_refresh',
+}
+
+
+def peer_uid(sock):
+    """uid van het proces aan de andere kant van een Unix socket, of None als dat niet op te vragen is"""
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return None
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+    return struct.unpack('3i', creds)[1]
+
+
+def get_if_changed(backend, event_id, known_fetched_at):
+    """Zoals get, maar zonder event als de client deze versie al heeft"""
+    cached = backend.get(event_id)
+    if cached is not None and cached[0] == known_fetched_at:
+        return cached[0], None
+    return cached
+
+
+class CacheRequestHandler(socketserver.BaseRequestHandler):
+    """Verwerkt berichten van één worker verbinding tot die gesloten wordt"""
+
+    def handle(self):
+        backend = self.server.backend
+        # Berichten worden ge-unpickled: alleen processen van dezelfde gebruiker
+        uid = peer_uid(self.request)
+        if uid is not None and uid != os.getuid():
+            logger.warning(f"Verbinding van uid {uid} geweigerd")
+            return
+        while True:
+            try:
+                message = recv_message(self.request)
+            except OSError:
+                return
+            if message is None:
+                return
+            op, args = message
+            try:
+                if op not in OPERATIONS:
+                    raise ValueError(f"Onbekende operatie: {op}")
+                if op == 'len':
+                    result = len(backend)
+                elif op == 'get_if_changed':
+                    result = get_if_changed(backend, *args)
+                else:
+                    result = getattr(backend, op)(*args)
+                reply = (True, result)
+            except Exception as e:
+                reply = (False, str(e))
+            send_message(self.request, reply)
+
+
+class CacheDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, address, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        if os.path.exists(address):
+            os.unlink(address)
+        # Socket direct met rechten 0600 aanmaken, niet eerst met die van de umask
+        umask = os.umask(0o177)
+        try:
+            super().__init__(address, CacheRequestHandler)
+        finally:
+            os.umask(umask)
+        os.chmod(address, 0o600)
+        self.backend = MemoryCacheBackend(max_entries=max_entries, max_bytes=max_bytes)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    address = argv[0] if argv else env_path('UFC_CACHE_SOCKET', 'event_cache.sock')
+    max_entries = int(os.environ.get('UFC_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+    max_bytes = int(os.environ.get('UFC_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    with CacheDaemon(address, max_entries=max_entries, max_bytes=max_bytes) as server:
+        logger.info(f"Cache daemon luistert op {address}")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Feed met wijzigingen per event (nieuw resultaat, gevecht live, segment gestart)
+voor Server-Sent Events en long-poll clients.
+
+Diffs worden één keer berekend wanneer de verversing een verandering ziet, en
+als kant-en-klare SSE frames bewaard; elke client hoeft alleen bytes te schrijven.
+Wachtende clients delen één Condition per event.
+
+Versies tellen per proces. Naar buiten gaan ze als "<epoch>.<n>", met een
+epoch die per proces uniek is: een versie van een andere gunicorn worker (of
+van vóór een herstart) wordt herkend en levert een reset op in plaats van
+diffs die bij een andere teller horen.
+"""
+from collections import deque
+from datetime import datetime
+import json
+import os
+import threading
+
+import pytz
+
+
+def fight_state(fight, is_live):
+    """Samenvatting van een gevecht waarop we wijzigingen detecteren"""
+    if fight.result and fight.result.method:
+        return ("result", fight.result.method, fight.result.ending_round, str(fight.result.ending_time))
+    if is_live:
+        return ("live",)
+    return ("pending",)
+
+
+def event_state(event, is_fight_live, now=None):
+    """Status van alle segmenten en gevechten van een event"""
+    now = now or datetime.now(pytz.UTC)
+    segments = {}
+    fights = {}
+    for segment in event.card_segments:
+        segments[segment.name] = bool(segment.start_time and segment.start_time <= now)
+        for fight in segment.fights:
+            fighters = fight.fighter_names
+            fights[(segment.name, fighters)] = fight_state(fight, is_fight_live(fight, segment, event))
+    return {"status": event.status, "segments": segments, "fights": fights}
+
+
+def diff_states(old, new):
+    """Lijst met wijzigingen tussen twee event states"""
+    changes = []
+    if old["status"] != new["status"]:
+        changes.append({"type": "event_status", "status": new["status"]})
+    for name, started in new["segments"].items():
+        if started and not old["segments"].get(name):
+            changes.append({"type": "segment_started", "segment": name})
+    for (segment_name, fighters), state in new["fights"].items():
+        previous = old["fights"].get((segment_name, fighters))
+        if previous == state:
+            continue
+        change = {"segment": segment_name, "fighters": list(fighters)}
+        if state[0] == "result":
+            change.update(type="result", result={
+                "method": state[1], "ending_round": state[2], "ending_time": state[3]})
+        elif state[0] == "live":
+            change["type"] = "live"
+        elif previous and previous[0] == "live":
+            change["type"] = "not_live"
+        else:
+            continue
+        changes.append(change)
+    return changes
+
+
+class EventFeed:
+    __slots__ = ('version', 'state', 'history', 'condition', 'subscribers')
+
+    def __init__(self, history_size):
+        self.version = 0
+        self.state = None
+        self.history = deque(maxlen=history_size)  # (version, changes, sse_frame)
+        self.condition = threading.Condition()
+        self.subscribers = 0
+
+
+FOREIGN_VERSION = -1  # Versie van een ander proces of onleesbaar: altijd een reset
+
+
+class ChangeFeed:
+    def __init__(self, history_size=100):
+        self.history_size = history_size
+        self._feeds = {}
+        self._lock = threading.Lock()
+        self._epoch_pid = None
+        self._epoch = None
+
+    @property
+    def epoch(self):
+        """Per proces uniek, ook voor workers die (met preload) van dezelfde master geforkt zijn"""
+        pid = os.getpid()
+        if self._epoch_pid != pid:
+            self._epoch_pid, self._epoch = pid, os.urandom(4).hex()
+        return self._epoch
+
+    def format_version(self, version):
+        return f"{self.epoch}.{version}"
+
+    def parse_version(self, value):
+        """
+        Versie nummer uit een "<epoch>.<n>" token; None als er geen versie is,
+        FOREIGN_VERSION als het token niet van dit proces komt
+        """
+        if not value:
+            return None
+        epoch, _, number = str(value).partition('.')
+        if epoch != self.epoch or not number.isdigit():
+            return FOREIGN_VERSION
+        return int(number)
+
+    def _feed(self, event_id):
+        with self._lock:
+            feed = self._feeds.get(event_id)
+            if feed is None:
+                feed = self._feeds[event_id] = EventFeed(self.history_size)
+            return feed
+
+    def publish(self, event_id, state):
+        """Vergelijk met de vorige state; bij wijzigingen een nieuwe versie uitsturen"""
+        feed = self._feed(event_id)
+        with feed.condition:
+            if feed.state is None:
+                # Eerste state is de basislijn, daar zijn geen diffs voor
+                feed.state = state
+                return []
+            changes = diff_states(feed.state, state)
+            feed.state = state
+            if not changes:
+                return []
+            feed.version += 1
+            version = self.format_version(feed.version)
+            payload = json.dumps({"version": version, "changes": changes})
+            frame = f"id: {version}\nevent: change\ndata: {payload}\n\n".encode('utf-8')
+            feed.history.append((feed.version, changes, frame))
+            feed.condition.notify_all()
+            return changes
+
+    def current_version(self, event_id):
+        return self._feed(event_id).version
+
+    def _since(self, feed, since):
+        """(reset, entries) sinds versie `since`; reset als die buiten de historie valt"""
+        if since == FOREIGN_VERSION or since > feed.version:
+            return True, []
+        if since < feed.version and (not feed.history or feed.history[0][0] > since + 1):
+            return True, []
+        return False, [entry for entry in feed.history if entry[0] > since]
+
+    def wait(self, event_id, since, timeout):
+        """
+        Wacht tot er een versie nieuwer dan `since` is, of tot de timeout.
+        Geeft (versie, reset, entries) terug.
+        """
+        feed = self._feed(event_id)
+        with feed.condition:
+            feed.condition.wait_for(lambda: feed.version != since, timeout=timeout)
+            reset, entries = self._since(feed, since)
+            return feed.version, reset, entries
+
+    def changes_since(self, event_id, since):
+        """Zoals wait(), maar zonder te wachten: (versie, reset, entries)"""
+        feed = self._feed(event_id)
+        with feed.condition:
+            reset, entries = self._since(feed, since)
+            return feed.version, reset, entries
+
+    def subscribe(self, event_id):
+        feed = self._feed(event_id)
+        with feed.condition:
+            feed.subscribers += 1
+
+    def unsubscribe(self, event_id):
+        feed = self._feed(event_id)
+        with feed.condition:
+            feed.subscribers -= 1
+
+    def subscribed_ids(self):
+        with self._lock:
+            return [k for k, feed in self._feeds.items() if feed.subscribers > 0]
+
+    def stats(self):
+        with self._lock:
+            return {
+                str(event_id): {"version": self.format_version(feed.version), "subscribers": feed.subscribers}
+                for event_id, feed in self._feeds.items()
+            }
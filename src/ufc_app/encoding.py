@@ -0,0 +1,47 @@
+"""Content negotiation voor event responses: JSON (orjson als die er is) of MessagePack"""
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson is optioneel; de stdlib json werkt ook
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optioneel; zonder msgpack alleen JSON
+    msgpack = None
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+MSGPACK_MIMETYPES = (MSGPACK_MIMETYPE, 'application/x-msgpack', 'application/vnd.msgpack')
+FORMATS = ('json', 'msgpack')
+
+
+class NotAcceptable(Exception):
+    """Het gevraagde formaat is onbekend of niet geïnstalleerd"""
+
+
+def choose_format(accept_mimetypes, requested=None):
+    """
+    'json' of 'msgpack'. Een expliciet ?format= gaat voor; anders de Accept
+    header, waarbij JSON de standaard blijft (ook voor */*).
+    """
+    if requested:
+        fmt = requested.lower()
+        if fmt not in FORMATS:
+            raise NotAcceptable(f"Onbekend formaat '{requested}', kies uit: {', '.join(FORMATS)}")
+    else:
+        best = accept_mimetypes.best_match((JSON_MIMETYPE,) + MSGPACK_MIMETYPES, default=JSON_MIMETYPE)
+        fmt = 'msgpack' if best in MSGPACK_MIMETYPES else 'json'
+    if fmt == 'msgpack' and msgpack is None:
+        raise NotAcceptable("MessagePack is niet beschikbaar op deze server (installeer msgpack)")
+    return fmt
+
+
+def encode(data, fmt):
+    """(body, mimetype) voor het gekozen formaat"""
+    if fmt == 'msgpack':
+        return msgpack.packb(data, use_bin_type=True), MSGPACK_MIMETYPE
+    if orjson is not None:
+        return orjson.dumps(data) + b"\n", JSON_MIMETYPE
+    return json.dumps(data) + "\n", JSON_MIMETYPE
@@ -0,0 +1,196 @@
+"""
+Gerichte extractor voor de UFC.com events pagina.
+
+In plaats van een volledige BeautifulSoup boom op te bouwen en daarna alle
+tekst te doorzoeken, loopt één streaming parse (html.parser) door de pagina
+en bewaart alleen de event kaarten en de live indicatoren. Het resultaat
+wordt per content hash gecachet, zodat de live probe en het debug endpoint
+één parse per paginaversie delen.
+"""
+from collections import OrderedDict, namedtuple
+import hashlib
+from html.parser import HTMLParser
+import threading
+
+LIVE_MARKERS = ("LIVE NOW", "LIVE EVENT")
+CARD_CLASS = "c-card-event"
+MAX_LIVE_TEXTS = 20
+
+# Elementen zonder eindtag; die tellen niet mee in de diepte
+VOID_ELEMENTS = frozenset((
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+))
+
+def _is_card(classes):
+    """Het kaart element zelf (c-card-event--result), niet de BEM elementen erin (__headline, __date)"""
+    return any(name.startswith(CARD_CLASS) and "__" not in name for name in classes.split())
+
+
+EventCard = namedtuple('EventCard', ['headline', 'url', 'section', 'date_text', 'is_live'])
+EventsPageInfo = namedtuple('EventsPageInfo', ['content_hash', 'events', 'has_live_marker', 'live_event', 'live_texts'])
+
+
+class _EventsPageParser(HTMLParser):
+    """
+    Houdt een stack van open elementen bij. html.parser herstelt geen
+    optionele eindtags (<p>, <li>), dus een eindtag sluit ook alle nog open
+    elementen erboven, en een element dat sluit neemt de kaart, sectie of
+    headline mee die erin begon. Een nieuwe kaart sluit de vorige altijd af.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []                 # Open tags
+        self.skip_level = None          # Binnen <script>/<style>/<noscript>
+        self.sections = []              # (stack niveau, 'upcoming'/'past')
+        self.card = None                # Huidige kaart als dict
+        self.card_level = None
+        self.headline_level = None
+        self.date_level = None
+        self.events = []
+        self.has_live_marker = False
+        self.live_texts = []
+
+    def _section(self):
+        return self.sections[-1][1] if self.sections else None
+
+    def _close_card(self):
+        card = self.card
+        self.events.append(EventCard(
+            headline=" ".join("".join(card["headline"]).split()),
+            url=card["url"],
+            section=card["section"],
+            date_text=" ".join("".join(card["date"]).split()),
+            is_live=card["live"],
+        ))
+        self.card = self.card_level = self.headline_level = self.date_level = None
+
+    def _pop_to(self, level):
+        """Sluit alle elementen vanaf stack niveau `level`"""
+        del self.stack[level:]
+        if self.skip_level is not None and self.skip_level >= level:
+            self.skip_level = None
+        if self.headline_level is not None and self.headline_level >= level:
+            self.headline_level = None
+        if self.date_level is not None and self.date_level >= level:
+            self.date_level = None
+        if self.card is not None and self.card_level >= level:
+            self._close_card()
+        while self.sections and self.sections[-1][0] >= level:
+            self.sections.pop()
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_ELEMENTS:
+            return
+        level = len(self.stack)
+        self.stack.append(tag)
+        if self.skip_level is not None:
+            return
+        if tag in ("script", "style", "noscript"):
+            self.skip_level = level
+            return
+
+        attributes = dict(attrs)
+        classes = attributes.get("class") or ""
+        marker = (attributes.get("id") or "") + " " + classes
+        if "upcoming" in marker:
+            self.sections.append((level, "upcoming"))
+        elif "past" in marker:
+            self.sections.append((level, "past"))
+
+        if _is_card(classes):
+            if self.card is not None:
+                # Vorige kaart niet (goed) gesloten: die eindigt hier
+                self._close_card()
+            self.card = {"headline": [], "url": None, "date": [], "live": False, "section": self._section()}
+            self.card_level = level
+            return
+        if self.card is None:
+            return
+
+        if "headline" in classes and self.headline_level is None:
+            self.headline_level = level
+        elif "date" in classes and self.date_level is None:
+            self.date_level = level
+        if tag == "a" and self.card["url"] is None and "/event/" in (attributes.get("href") or ""):
+            self.card["url"] = attributes["href"]
+
+    def handle_endtag(self, tag):
+        if tag in VOID_ELEMENTS:
+            return
+        # Het dichtstbijzijnde open element met deze tag; een losse eindtag wordt genegeerd
+        for level in range(len(self.stack) - 1, -1, -1):
+            if self.stack[level] == tag:
+                self._pop_to(level)
+                return
+
+    def handle_data(self, data):
+        if self.skip_level is not None:
+            return
+        # Hoofdlettergevoelig, zoals de banner: "Watch Live Events" in de navigatie telt niet
+        live = any(marker in data for marker in LIVE_MARKERS)
+        if live:
+            self.has_live_marker = True
+        if "LIVE" in data.upper() and len(self.live_texts) < MAX_LIVE_TEXTS:
+            text = data.strip()
+            if text:
+                self.live_texts.append(text)
+        if self.card is not None:
+            if live:
+                self.card["live"] = True
+            if self.headline_level is not None:
+                self.card["headline"].append(data)
+            elif self.date_level is not None:
+                self.card["date"].append(data)
+
+
+def parse_events_page(html):
+    """Parse de pagina één keer en geef een EventsPageInfo terug"""
+    content_hash = hashlib.sha1(html.encode('utf-8', 'replace')).hexdigest()
+    parser = _EventsPageParser()
+    # De <head> (scripts, metadata) bevat geen events of banners; sla die over
+    body_start = html.find("<body")
+    parser.feed(html[body_start:] if body_start != -1 else html)
+    parser.close()
+    if parser.card is not None:
+        parser._close_card()  # Afgekapte pagina: de laatste kaart toch meenemen
+    live_event = next((card for card in parser.events if card.is_live), None)
+    return EventsPageInfo(
+        content_hash=content_hash,
+        events=tuple(parser.events),
+        has_live_marker=parser.has_live_marker,
+        live_event=live_event,
+        live_texts=tuple(parser.live_texts),
+    )
+
+
+class EventsPageExtractor:
+    """Cachet de extractie per content hash, zodat elke paginaversie één keer geparsed wordt"""
+
+    def __init__(self, max_entries=4):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.parses = 0
+        self.hits = 0
+
+    def extract(self, html):
+        content_hash = hashlib.sha1(html.encode('utf-8', 'replace')).hexdigest()
+        with self._lock:
+            info = self._entries.get(content_hash)
+            if info is not None:
+                self._entries.move_to_end(content_hash)
+                self.hits += 1
+                return info
+        info = parse_events_page(html)
+        with self._lock:
+            self.parses += 1
+            self._entries[content_hash] = info
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return info
+
+
+# Eén gedeelde extractor voor de live probe en het debug endpoint
+events_page_extractor = EventsPageExtractor()
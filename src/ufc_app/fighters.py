@@ -0,0 +1,266 @@
+"""Fighter index over de gecachte events en een TTL cache voor fighter profielen"""
+from collections import OrderedDict
+from dataclasses import asdict, is_dataclass
+from datetime import date, datetime
+import re
+import threading
+import time
+import unicodedata
+
+UFC_ATHLETE_URL = "https://www.ufc.com/athlete/{}"
+
+
+def fighter_slug(value):
+    """
+    Normaliseer een naam, slug of athlete URL naar een UFC.com slug,
+    bv. "José Aldo" en "https://www.ufc.com/athlete/jose-aldo" -> "jose-aldo".
+    """
+    value = str(value).strip().rstrip('/')
+    if '/athlete/' in value:
+        value = value.rsplit('/athlete/', 1)[1]
+    value = unicodedata.normalize('NFKD', value).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '-', value.lower()).strip('-')
+
+
+def athlete_url(fighter, slug):
+    """De athlete URL van een fighter object, of de standaard URL voor deze slug"""
+    url = getattr(fighter, 'url', None) if fighter is not None else None
+    return url or UFC_ATHLETE_URL.format(slug)
+
+
+def to_jsonable(value, depth=0):
+    """Zet een scraper object (dataclass, object of dict) om naar JSON-vriendelijke data"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if depth > 6:
+        return str(value)
+    if isinstance(value, dict):
+        return {str(k): to_jsonable(v, depth + 1) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [to_jsonable(v, depth + 1) for v in value]
+    if is_dataclass(value):
+        return to_jsonable(asdict(value), depth + 1)
+    if hasattr(value, '__dict__'):
+        return {k: to_jsonable(v, depth + 1) for k, v in vars(value).items() if not k.startswith('_')}
+    return str(value)
+
+
+def _fight_entry(event_id, event, segment, position, fight, corner):
+    """Eén regel in de index: een gevecht vanuit het perspectief van één fighter"""
+    names = list(fight.fighter_names)
+    result = fight.result if fight.result and fight.result.method else None
+    return {
+        "event_id": event_id,
+        "event_name": event.name,
+        "event_status": event.status,
+        "segment": segment.name,
+        "position": position,
+        "fighters": names,
+        "opponents": [name for i, name in enumerate(names) if i != corner],
+        "result": {
+            "method": result.method,
+            "ending_round": result.ending_round,
+            "ending_time": str(result.ending_time),
+        } if result else None,
+    }
+
+
+class FighterIndex:
+    """
+    In-memory index fighter slug -> gevechten in de gecachte events.
+
+    Wordt bijgewerkt zodra een event in de cache komt (per event vervangen),
+    zodat vragen als "welke gevechten op de huidige kaart heeft fighter X"
+    zonder upstream aanroepen beantwoord worden.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fighters = {}  # slug -> {"name", "url", "fights": {event_id: [entry, ...]}}
+        self._versions = {}  # event_id -> content hash van het geïndexeerde event
+        self._event_slugs = {}  # event_id -> slugs op die kaart, in kaartvolgorde
+        self._synced = {}  # event_id -> fetched_at waarmee sync() het event voor het laatst zag
+        self.updates = 0
+
+    def update(self, event_id, event):
+        """(Her)indexeer één event; een event met dezelfde content hash wordt overgeslagen"""
+        if self._versions.get(event_id) == event.content_hash:
+            return False
+        fighters = {}
+        slugs = []
+        for segment in event.card_segments:
+            for position, fight in enumerate(segment.fights):
+                for corner, fighter in enumerate(fight.fighters):
+                    slug = fighter_slug(fighter.name)
+                    if not slug:
+                        continue
+                    info = fighters.setdefault(slug, {
+                        "name": fighter.name,
+                        "url": athlete_url(fighter, slug),
+                        "fights": [],
+                    })
+                    info["fights"].append(_fight_entry(event_id, event, segment, position, fight, corner))
+                    if slug not in slugs:
+                        slugs.append(slug)
+
+        with self._lock:
+            if self._versions.get(event_id) == event.content_hash:
+                return False
+            self._remove(event_id)
+            for slug, info in fighters.items():
+                entry = self._fighters.setdefault(slug, {"name": info["name"], "url": info["url"], "fights": {}})
+                entry["name"], entry["url"] = info["name"], info["url"]
+                entry["fights"][event_id] = info["fights"]
+            self._versions[event_id] = event.content_hash
+            self._event_slugs[event_id] = slugs
+            self.updates += 1
+        return True
+
+    def _remove(self, event_id):
+        for slug in self._event_slugs.pop(event_id, ()):
+            entry = self._fighters.get(slug)
+            if entry is None:
+                continue
+            entry["fights"].pop(event_id, None)
+            if not entry["fights"]:
+                del self._fighters[slug]
+        self._versions.pop(event_id, None)
+
+    def remove(self, event_id):
+        with self._lock:
+            self._remove(event_id)
+
+    def sync(self, versions, load):
+        """
+        Breng de index in lijn met de cache inhoud: `versions` is
+        event_cache.versions() en `load` haalt één event op (event_cache.get).
+        Alleen events met een nieuwe fetched_at worden geladen en zo nodig
+        opnieuw geïndexeerd; verwijderde events worden vergeten. Nodig bij een
+        gedeelde cache, waar een andere worker events kan zetten.
+        """
+        present = set()
+        for event_id, fetched_at in versions:
+            present.add(event_id)
+            if self._synced.get(event_id) == fetched_at:
+                continue
+            cached = load(event_id)
+            if cached is None:
+                continue
+            self.update(event_id, cached[1])
+            self._synced[event_id] = fetched_at
+        with self._lock:
+            for event_id in [k for k in self._versions if k not in present]:
+                self._remove(event_id)
+            for event_id in [k for k in self._synced if k not in present]:
+                del self._synced[event_id]
+
+    def lookup(self, slug, event_id=None):
+        """Naam, URL en gevechten van een fighter (optioneel alleen van één event), of None"""
+        with self._lock:
+            entry = self._fighters.get(slug)
+            if entry is None:
+                return None
+            fights = entry["fights"]
+            if event_id is not None:
+                fights = {event_id: fights[event_id]} if event_id in fights else {}
+            return {
+                "slug": slug,
+                "name": entry["name"],
+                "url": entry["url"],
+                "fights": [fight for k in sorted(fights) for fight in fights[k]],
+            }
+
+    def card(self, event_id):
+        """Alle fighters op de kaart van een event (in kaartvolgorde), of None als het event niet geïndexeerd is"""
+        with self._lock:
+            slugs = self._event_slugs.get(event_id)
+            if slugs is None:
+                return None
+            slugs = list(slugs)
+        return [self.lookup(slug) for slug in slugs]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "fighters": len(self._fighters),
+                "events": sorted(self._versions),
+                "updates": self.updates,
+            }
+
+
+class ProfileLookupFailed(Exception):
+    """Het ophalen van dit profiel is kort geleden mislukt; niet opnieuw proberen tot de failure TTL verstreken is"""
+
+
+class FighterProfileCache:
+    """
+    Begrensde TTL cache voor fighter profielen (slug -> (opgehaald_op, profiel)).
+    Mislukte lookups worden apart en korter onthouden, zodat een onbekende slug
+    niet bij elke request opnieuw gescrapet wordt.
+    """
+
+    def __init__(self, ttl=6 * 3600, max_entries=256, failure_ttl=300):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.failure_ttl = failure_ttl
+        self._entries = OrderedDict()
+        self._failures = OrderedDict()  # slug -> (mislukt_op, foutmelding)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.failure_hits = 0
+
+    def get(self, slug, allow_expired=False):
+        """Het gecachte profiel, of None als het ontbreekt of verlopen is"""
+        with self._lock:
+            cached = self._entries.get(slug)
+            if cached is None or (not allow_expired and time.time() - cached[0] >= self.ttl):
+                if not allow_expired:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(slug)
+            if not allow_expired:
+                self.hits += 1
+            return cached[1]
+
+    def set(self, slug, profile):
+        with self._lock:
+            self._failures.pop(slug, None)
+            self._entries[slug] = (time.time(), profile)
+            self._entries.move_to_end(slug)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_failure(self, slug):
+        """De foutmelding van een recent mislukte lookup, of None"""
+        with self._lock:
+            failed = self._failures.get(slug)
+            if failed is None:
+                return None
+            if time.time() - failed[0] >= self.failure_ttl:
+                del self._failures[slug]
+                return None
+            self.failure_hits += 1
+            return failed[1]
+
+    def set_failure(self, slug, error):
+        with self._lock:
+            self._failures[slug] = (time.time(), error)
+            self._failures.move_to_end(slug)
+            while len(self._failures) > self.max_entries:
+                self._failures.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "failures": len(self._failures),
+                "failure_ttl_seconds": self.failure_ttl,
+                "failure_hits": self.failure_hits,
+            }
@@ -0,0 +1,58 @@
+"""Leader election tussen worker processen via een file lock"""
+import logging
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - niet beschikbaar op Windows
+    fcntl = None
+
+logger = logging.getLogger('ufc_app')
+
+
+class LeaderLock:
+    """
+    Exclusieve, niet-blokkerende flock op een bestand. Het proces dat de lock
+    heeft is leader totdat het stopt; het besturingssysteem geeft de lock dan
+    vrij en een ander proces kan het bij de volgende poging overnemen.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_leader(self):
+        return self._fd is not None and self._pid == os.getpid()
+
+    def try_acquire(self):
+        """Probeer leader te worden; True als dit proces de lock (al) heeft"""
+        with self._lock:
+            if self.is_leader:
+                return True
+            if fcntl is None:
+                self._fd, self._pid = -1, os.getpid()
+                return True
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            os.ftruncate(fd, 0)
+            os.write(fd, str(os.getpid()).encode())
+            self._fd, self._pid = fd, os.getpid()
+            logger.info(f"Proces {self._pid} is leader voor de achtergrond verversing")
+            return True
+
+
+class SoloLeaderLock:
+    """Zonder gedeelde cache is elk proces zijn eigen leader"""
+
+    is_leader = True
+
+    def try_acquire(self):
+        return True
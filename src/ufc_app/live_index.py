@@ -0,0 +1,101 @@
+"""Vooraf berekende live-index per event, zodat live status in O(1) op te vragen is"""
+from collections import OrderedDict
+import threading
+
+
+def _has_result(fight):
+    return bool(fight.result and fight.result.method)
+
+
+class SegmentIndex:
+    """Per segment: welke gevechten klaar zijn en welk gevecht live kan zijn"""
+
+    __slots__ = ('completed', 'previous_completed', 'live_position')
+
+    def __init__(self, segment, in_progress):
+        self.completed = [_has_result(f) for f in segment.fights]
+
+        # previous_completed[i]: zijn alle gevechten vóór i afgelopen?
+        self.previous_completed = []
+        all_done = True
+        for done in self.completed:
+            self.previous_completed.append(all_done)
+            all_done = all_done and done
+
+        # Het eerste gevecht zonder resultaat is de enige kandidaat voor "live"
+        self.live_position = None
+        for i, done in enumerate(self.completed):
+            if done:
+                continue
+            if in_progress:
+                # Als het volgende gevecht al klaar is, dan is dit niet live
+                next_done = i < len(self.completed) - 1 and self.completed[i + 1]
+                if not next_done:
+                    self.live_position = i
+            elif i > 0:
+                # Zonder "In Progress" alleen na een reeks afgelopen gevechten
+                self.live_position = i
+            break
+
+
+class LiveIndex:
+    """Posities van alle gevechten en de live kandidaat per segment van één event"""
+
+    __slots__ = ('in_progress', 'positions', 'segments')
+
+    def __init__(self, event):
+        self.in_progress = event.status == "In Progress"
+        self.positions = {}
+        self.segments = []
+        for s, segment in enumerate(event.card_segments):
+            for i, fight in enumerate(segment.fights):
+                self.positions.setdefault(id(fight), (s, i))
+            self.segments.append(SegmentIndex(segment, self.in_progress))
+
+    def position(self, fight):
+        return self.positions.get(id(fight))
+
+    def is_live_candidate(self, fight):
+        """True als dit gevecht volgens de volgorde en resultaten live kan zijn"""
+        position = self.positions.get(id(fight))
+        if position is None:
+            return False
+        segment_position, fight_position = position
+        return self.segments[segment_position].live_position == fight_position
+
+    def live_fights(self, event):
+        """De gedetecteerde live kandidaat per segment (segment, fight) paren"""
+        result = []
+        for segment, seg_index in zip(event.card_segments, self.segments):
+            if seg_index.live_position is not None:
+                result.append((segment, segment.fights[seg_index.live_position]))
+        return result
+
+
+class LiveIndexCache:
+    """
+    Bewaart de index per event object. Het event object zelf wordt vastgehouden,
+    zodat id(event) niet hergebruikt kan worden zolang de index in de cache staat.
+    """
+
+    def __init__(self, max_entries=16):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def get(self, event):
+        key = id(event)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is event:
+                self._entries.move_to_end(key)
+                return entry[1]
+        index = LiveIndex(event)
+        with self._lock:
+            self.builds += 1
+            self._entries[key] = (event, index)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index
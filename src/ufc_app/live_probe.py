@@ -0,0 +1,183 @@
+"""Gedeelde, rate-limited probe voor de live-indicator op UFC.com"""
+from collections import namedtuple
+import logging
+import threading
+import time
+
+from .events_page import events_page_extractor
+from .upstream import CircuitOpenError, RetryBudget, UpstreamClient
+
+logger = logging.getLogger('ufc_app')
+
+UFC_EVENTS_URL = "https://www.ufc.com/events"
+
+# Laatste bekende toestand van de UFC.com events pagina; `page` is de
+# gestructureerde extractie (EventsPageInfo) van die paginaversie. De HTML zelf
+# wordt niet bewaard: na de extractie is die niet meer nodig.
+LiveSnapshot = namedtuple(
+    'LiveSnapshot',
+    ['checked_at', 'status_code', 'is_live', 'etag', 'last_modified', 'page']
+)
+
+
+class LiveIndicatorProbe:
+    """
+    Haalt de UFC.com events pagina hoogstens één keer per interval op en
+    bedient alle aanroepers vanuit de laatste snapshot.
+
+    - Eén gedeelde, gepoolde session met circuit breaker (zie upstream.py)
+    - Conditionele requests via ETag / If-Modified-Since
+    - Tellers voor uitgevoerde en vermeden probes
+    - Niet-blokkerend gebruik: een verouderde snapshot wordt geserveerd terwijl
+      een achtergrondthread de pagina ververst
+    """
+
+    def __init__(self, url=UFC_EVENTS_URL, interval=30, timeout=5, client=None):
+        self.url = url
+        self.interval = interval
+        self.timeout = timeout
+        self.client = client or UpstreamClient('ufc.com', RetryBudget(), timeout=timeout)
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._stats = {
+            "requests_served": 0,
+            "probes_avoided": 0,
+            "fetches": 0,
+            "not_modified": 0,
+            "errors": 0,
+            "background_refreshes": 0,
+            "circuit_open": 0,
+        }
+
+    @property
+    def session(self):
+        """De session van de upstream client; requests wordt pas bij de eerste probe geïmporteerd"""
+        return self.client.session
+
+    @session.setter
+    def session(self, value):
+        self.client.session = value
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _is_fresh(self, snapshot):
+        return snapshot is not None and time.time() - snapshot.checked_at < self.interval
+
+    def get_snapshot(self, block=True):
+        """
+        Geef de laatste snapshot terug, ververs alleen als het interval verstreken is.
+        Met block=False wacht de aanroeper nooit op UFC.com: de verversing gebeurt
+        op de achtergrond en de (mogelijk ontbrekende) oude snapshot wordt teruggegeven.
+        """
+        self._count("requests_served")
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            self._count("probes_avoided")
+            return snapshot
+
+        if not block:
+            self._count("probes_avoided")
+            self._refresh_in_background()
+            return snapshot
+
+        # Als er al een andere thread aan het ophalen is, serveer de oude snapshot
+        if not self._fetch_lock.acquire(blocking=snapshot is None):
+            self._count("probes_avoided")
+            return snapshot
+
+        try:
+            # Opnieuw controleren: misschien heeft een andere thread net ververst
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                self._count("probes_avoided")
+                return snapshot
+            self._snapshot = self._fetch(snapshot)
+            return self._snapshot
+        finally:
+            self._fetch_lock.release()
+
+    def _refresh_in_background(self):
+        """Start een verversing op een achtergrondthread, tenzij er al een loopt"""
+        if not self._fetch_lock.acquire(blocking=False):
+            return
+        self._count("background_refreshes")
+
+        def refresh():
+            try:
+                if not self._is_fresh(self._snapshot):
+                    self._snapshot = self._fetch(self._snapshot)
+            finally:
+                self._fetch_lock.release()
+
+        threading.Thread(target=refresh, name='ufc-live-probe', daemon=True).start()
+
+    def _fetch(self, previous):
+        """Voer één (conditionele) GET uit en bouw een nieuwe snapshot"""
+        headers = {}
+        if previous is not None:
+            if previous.etag:
+                headers["If-None-Match"] = previous.etag
+            if previous.last_modified:
+                headers["If-Modified-Since"] = previous.last_modified
+
+        now = time.time()
+        self._count("fetches")
+        try:
+            response = self.client.get(self.url, headers=headers, timeout=self.timeout)
+        except CircuitOpenError:
+            # UFC.com is ongezond: niet wachten, de laatste snapshot blijft geldig
+            self._count("circuit_open")
+            if previous is not None:
+                return previous._replace(checked_at=now)
+            return LiveSnapshot(now, None, False, None, None, None)
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"Live probe naar {self.url} mislukt: {str(e)}")
+            if previous is not None:
+                return previous._replace(checked_at=now)
+            return LiveSnapshot(now, None, False, None, None, None)
+
+        if response.status_code == 304 and previous is not None:
+            self._count("not_modified")
+            return previous._replace(checked_at=now)
+
+        if response.status_code != 200:
+            self._count("errors")
+            return LiveSnapshot(now, response.status_code, False, None, None, None)
+
+        # Eén parse per paginaversie; een ongewijzigde pagina komt uit de hash-cache
+        page = events_page_extractor.extract(response.text)
+        return LiveSnapshot(
+            checked_at=now,
+            status_code=response.status_code,
+            is_live=page.has_live_marker,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            page=page,
+        )
+
+    def is_live(self):
+        """True als UFC.com een live indicator toont, anders None (geen bevestiging)"""
+        snapshot = self.get_snapshot(block=False)
+        if snapshot is not None and snapshot.is_live:
+            return True
+        return None
+
+    def stats(self):
+        """Tellers en snapshot-leeftijd voor /api/status"""
+        with self._lock:
+            stats = dict(self._stats)
+        snapshot = self._snapshot
+        stats["interval_seconds"] = self.interval
+        stats["snapshot_age_seconds"] = (
+            round(time.time() - snapshot.checked_at) if snapshot else None
+        )
+        stats["live_indicator"] = snapshot.is_live if snapshot else None
+        page = snapshot.page if snapshot else None
+        stats["live_event"] = page.live_event.headline if page and page.live_event else None
+        stats["page_parses"] = events_page_extractor.parses
+        stats["page_parse_cache_hits"] = events_page_extractor.hits
+        return stats
@@ -1,101 +1,541 @@
-from ufc_data_scraper.ufc_scraper import scrape_event_url, scrape_event_fmid, get_event_fmid
-from flask import jsonify, request, Response
+from flask import Blueprint, g, jsonify, request, Response
 import os
-from . import app
+from .archive import FINAL_STATUS, EventArchive
+from .cache_backends import make_cache_backend
+from .change_feed import ChangeFeed, event_state
+from .encoding import NotAcceptable, choose_format, encode
+from .fighters import (FighterIndex, FighterProfileCache, ProfileLookupFailed, athlete_url, fighter_slug,
+                       to_jsonable)
+from .leader import LeaderLock, SoloLeaderLock
+from .live_index import LiveIndexCache
+from .live_probe import LiveIndicatorProbe
+from .metrics import Registry
+from .response_cache import RenderedResponse, ResponseCache, make_cached_response
+from .scheduler import RefreshScheduler, compute_refresh_interval
+from .singleflight import SingleFlight
+from .schedule import ScheduleResolver
+from .snapshot import to_snapshot
+from .storage import UnsafeFileError, env_path
+from .upstream import STATE_VALUES, CircuitOpenError, RetryBudget, UpstreamClient
+from .warm_start import load_snapshot, save_snapshot
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import pytz
 import time
-import requests
-from bs4 import BeautifulSoup
 import json
 import threading
 import logging
+import atexit
 
-# Constante waarden voor event IDs
+# Alle routes hangen aan deze blueprint; create_app() registreert hem op de app
+bp = Blueprint('ufc', __name__)
+
+# Standaard event IDs; gelden tot de schedule resolver het echte schema kent
 DEFAULT_LAST_EVENT_ID = 1250
 DEFAULT_CURRENT_EVENT_ID = 1251
 DEFAULT_NEXT_EVENT_ID = 1252
 
-# Light-weight caching zonder externe afhankelijkheden
-event_cache = {}
+# Light-weight caching zonder externe afhankelijkheden; met UFC_CACHE_BACKEND=sqlite
+# of socket delen alle gunicorn workers één cache (zie cache_backends.py)
+event_cache = make_cache_backend()
+# Huidig en volgend event worden nooit uit de cache verwijderd
+event_cache.set_pinned({DEFAULT_CURRENT_EVENT_ID, DEFAULT_NEXT_EVENT_ID})
+cache_lock = threading.RLock()  # Beschermt de lokale administratie en last_check_time
 last_check_time = None
 CACHE_EXPIRY = 300  # 5 minuten cache expiry
+# Stale-while-revalidate: na de soft TTL wordt de cache direct geserveerd en op de
+# achtergrond ververst; na de hard TTL wacht een request op verse data
+CACHE_SOFT_TTL = int(os.environ.get('CACHE_SOFT_TTL', CACHE_EXPIRY))
+CACHE_HARD_TTL = int(os.environ.get('CACHE_HARD_TTL', 3600))
+HOT_EVENT_WINDOW = int(os.environ.get('HOT_EVENT_WINDOW', 3600))  # Events die recent opgevraagd zijn
+HOT_EVENT_MAX = int(os.environ.get('HOT_EVENT_MAX', 20))  # Hoogstens zoveel opgevraagde events verversen
+REFRESH_WORKERS = int(os.environ.get('REFRESH_WORKERS', 4))
+REFRESH_CLAIM_TTL = 60  # Seconden dat een worker een verversing mag claimen
+REQUEST_MARK_INTERVAL = 60  # Hoe vaak een aanvraag naar de gedeelde cache geschreven wordt
+# Bestanden van de app staan standaard in een privé map (zie storage.py), niet in /tmp
+LEADER_LOCK_PATH = env_path('UFC_LEADER_LOCK', 'refresher.lock')
+LEADER_RETRY_INTERVAL = 30  # Seconden tussen pogingen om leader te worden
+FEED_POLL_INTERVAL = 5  # Niet-leaders: hoe vaak de gedeelde cache op wijzigingen gecontroleerd wordt
+STREAM_KEEPALIVE = 15  # Seconden tussen SSE keepalive berichten
+LONG_POLL_TIMEOUT = 25  # Maximale wachttijd voor /event/<id>/changes
+# Open SSE streams en wachtende long-polls per worker; elk houdt een worker thread
+# bezet, dus gunicorn.conf.py zet dit op de helft van de threads (0 = geen streams)
+MAX_STREAMS = int(os.environ.get('UFC_MAX_STREAMS', 8))
+STREAM_RETRY_AFTER = 30  # Seconden in de Retry-After header als alle stream plaatsen bezet zijn
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', 4))  # Parallelle scrapes voor /events
+BATCH_MAX_IDS = 20
+# Warm start: periodieke snapshot van de cache op schijf (leeg pad schakelt dit uit)
+SNAPSHOT_PATH = env_path('UFC_SNAPSHOT_PATH', 'event_cache.snapshot')
+SNAPSHOT_INTERVAL = int(os.environ.get('UFC_SNAPSHOT_INTERVAL', 60))
+SNAPSHOT_MAX_AGE = int(os.environ.get('UFC_SNAPSHOT_MAX_AGE', 24 * 3600))
+LIVE_PROBE_INTERVAL = int(os.environ.get('LIVE_PROBE_INTERVAL', 30))  # Seconden tussen UFC.com probes
+FIGHTER_CACHE_TTL = int(os.environ.get('FIGHTER_CACHE_TTL', 6 * 3600))  # Profielen veranderen zelden
+FIGHTER_CACHE_MAX_ENTRIES = int(os.environ.get('FIGHTER_CACHE_MAX_ENTRIES', 256))
+FIGHTER_FAILURE_TTL = int(os.environ.get('FIGHTER_FAILURE_TTL', 300))  # Mislukte profiel lookups onthouden
+# Upstream: na zoveel opeenvolgende fouten gaat de circuit breaker open, en zo lang blijft hij open
+UPSTREAM_FAILURE_THRESHOLD = int(os.environ.get('UPSTREAM_FAILURE_THRESHOLD', 5))
+UPSTREAM_RESET_TIMEOUT = int(os.environ.get('UPSTREAM_RESET_TIMEOUT', 30))
+UPSTREAM_RETRY_RATIO = float(os.environ.get('UPSTREAM_RETRY_RATIO', 0.1))  # Retries als fractie van aanroepen
+# Historisch archief (sqlite, zie archive.py); leeg pad schakelt het uit
+ARCHIVE_PATH = env_path('UFC_ARCHIVE_PATH', 'archive.sqlite3')
+ARCHIVE_MAX_LIMIT = 500
+# Projectie en filters voor /event/<id> (?fields=, ?only=)
+FIGHT_FIELDS = ("fighters", "result", "status")
+ONLY_FILTERS = ("live", "results", "changed")
+SCHEDULE_REFRESH_INTERVAL = int(os.environ.get('SCHEDULE_REFRESH_INTERVAL', 900))  # Event schema verversen
 
 # Configureer logging
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger('ufc_app')
 
+# Eén retry budget voor alle upstream aanroepen; elke upstream heeft een eigen circuit breaker
+retry_budget = RetryBudget(ratio=UPSTREAM_RETRY_RATIO)
+upstreams = {
+    name: UpstreamClient(name, retry_budget, failure_threshold=UPSTREAM_FAILURE_THRESHOLD,
+                         reset_timeout=UPSTREAM_RESET_TIMEOUT)
+    for name in ('ufc.com', 'scraper', 'fighter_profiles')
+}
+
+# Eén gedeelde probe voor de live-indicator op UFC.com, voor alle requests en threads
+live_probe = LiveIndicatorProbe(interval=LIVE_PROBE_INTERVAL, client=upstreams['ufc.com'])
+
+# Hoogstens één lopende scrape per event ID; andere threads sluiten aan
+event_flight = SingleFlight()
+
+def scrape_event_fmid(event_fmid):
+    """Scrape een event; de scraper (en zijn afhankelijkheden) wordt pas bij gebruik geïmporteerd"""
+    from ufc_data_scraper.ufc_scraper import scrape_event_fmid as scrape
+    return scrape(event_fmid)
+
+def get_event_fmid(url):
+    """fmid van een event URL op UFC.com, via de (lazy geïmporteerde) scraper"""
+    from ufc_data_scraper.ufc_scraper import get_event_fmid as resolve
+    return resolve(url)
+
+def scrape_fighter_url(url):
+    """Scrape een fighter profiel (athlete pagina op UFC.com), ook lazy geïmporteerd"""
+    from ufc_data_scraper.ufc_scraper import scrape_fighter_url as scrape
+    return scrape(url)
+
+def _on_schedule_change(previous, schedule):
+    """Het nieuwe huidige en volgende event vastpinnen in de cache"""
+    event_cache.set_pinned({schedule.current, schedule.next} - {None})
+
+# Vorig/huidig/volgend event volgens UFC.com, met de DEFAULT_* IDs als terugval
+event_schedule = ScheduleResolver(
+    live_probe, lambda url: upstreams['scraper'].call(get_event_fmid, url),
+    (DEFAULT_LAST_EVENT_ID, DEFAULT_CURRENT_EVENT_ID, DEFAULT_NEXT_EVENT_ID),
+    interval=SCHEDULE_REFRESH_INTERVAL, on_change=_on_schedule_change)
+
+def current_event_id():
+    return event_schedule.get().current
+
+# Gerenderde response bodies per event versie (ETag, gzip/brotli varianten); ruimte
+# voor meerdere projecties en formaten per event
+response_cache = ResponseCache(max_entries=128)
+
+# Wijzigingen per event voor SSE en long-poll clients
+change_feed = ChangeFeed()
+
+# Plaatsen voor open streams en long-polls; daarboven 503 (SSE) of direct antwoord (long-poll)
+stream_slots = threading.BoundedSemaphore(MAX_STREAMS) if MAX_STREAMS > 0 else None
+stream_stats = {"rejected_streams": 0, "immediate_polls": 0}
+
+# Live-index per event object; wordt alleen opnieuw gebouwd als een scrape iets verandert
+live_indexes = LiveIndexCache()
+
+# Fighter -> gevechten over alle gecachte events, plus gecachte fighter profielen
+fighter_index = FighterIndex()
+fighter_profiles = FighterProfileCache(ttl=FIGHTER_CACHE_TTL, max_entries=FIGHTER_CACHE_MAX_ENTRIES,
+                                       failure_ttl=FIGHTER_FAILURE_TTL)
+fighter_flight = SingleFlight()
+
+# Afgeronde events worden gearchiveerd en daarna zonder scrape uit het archief geserveerd
+def _open_archive():
+    if not ARCHIVE_PATH:
+        return None
+    try:
+        return EventArchive(ARCHIVE_PATH)
+    except UnsafeFileError as e:
+        logger.error(f"Archief uitgeschakeld: {str(e)}")
+        return None
+
+event_archive = _open_archive()
+
+# Prometheus metrics voor /metrics
+metrics = Registry()
+REQUEST_LATENCY = metrics.histogram(
+    'ufc_http_request_duration_seconds', 'Latency van HTTP requests per route',
+    ('route', 'method', 'status'))
+SCRAPE_DURATION = metrics.histogram(
+    'ufc_scrape_duration_seconds', 'Duur van scrape_event_fmid aanroepen', ('outcome',),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+SCRAPE_ERRORS = metrics.counter('ufc_scrape_errors', 'Mislukte scrape_event_fmid aanroepen')
+
+def _scrape_and_store(event_id):
+    """Scrape een event en sla het resultaat op in de cache"""
+    global last_check_time
+    
+    logger.info(f"Cache miss voor event {event_id}, ophalen verse data")
+    start = time.perf_counter()
+    try:
+        # Eén keer omzetten naar het compacte snapshot model; daarna werkt alles daarmee
+        event = to_snapshot(upstreams['scraper'].call(scrape_event_fmid, event_id))
+    except CircuitOpenError:
+        SCRAPE_DURATION.observe(time.perf_counter() - start, outcome="circuit_open")
+        raise
+    except Exception:
+        SCRAPE_DURATION.observe(time.perf_counter() - start, outcome="error")
+        SCRAPE_ERRORS.inc()
+        raise
+    SCRAPE_DURATION.observe(time.perf_counter() - start, outcome="success")
+    current_time = datetime.now()
+    
+    # Als er niets veranderd is (zelfde content hash, O(1)), houden we het bestaande
+    # object en slaan we live-index, fighter index, archief en rendering over
+    previous = event_cache.get(event_id)
+    if previous and getattr(previous[1], 'content_hash', None) == event.content_hash:
+        event = previous[1]
+    else:
+        live_indexes.get(event)
+        fighter_index.update(event_id, event)
+        _archive_event(event_id, event)
+    
+    # Update de cache (de backend houdt de cache-grootte beperkt)
+    event_cache.set(event_id, current_time, event)
+    with cache_lock:
+        last_check_time = current_time
+    
+    return event
+
+def _archive_event(event_id, event):
+    """Schrijf een gewijzigd event naar het archief; een archieffout mag een scrape niet breken"""
+    if event_archive is None:
+        return
+    try:
+        event_archive.store_event(event_id, event)
+    except Exception as e:
+        logger.error(f"Fout bij archiveren event {event_id}: {str(e)}")
+
+def _load_from_archive(event_id):
+    """Een afgerond event uit het archief in de cache zetten, of None"""
+    if event_archive is None:
+        return None
+    try:
+        event = event_archive.load_event(event_id)
+    except Exception as e:
+        logger.error(f"Fout bij lezen event {event_id} uit archief: {str(e)}")
+        return None
+    if event is None or event.status != FINAL_STATUS:
+        return None
+    event = to_snapshot(event)
+    logger.info(f"Event {event_id} uit het archief geladen")
+    event_cache.set(event_id, datetime.now(), event)
+    live_indexes.get(event)
+    fighter_index.update(event_id, event)
+    return event
+
+def _load_or_scrape(event_id):
+    """Afgeronde events komen uit het archief, al het andere van de upstream"""
+    event = _load_from_archive(event_id)
+    if event is not None:
+        return event
+    return _scrape_and_store(event_id)
+
+# Worker pool voor achtergrond verversingen (stale-while-revalidate)
+refresh_executor = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix='ufc-refresh')
+# Begrensde pool voor cache misses in het /events batch endpoint
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='ufc-batch')
+pending_refreshes = set()
+recent_requests = {}  # event_id -> tijdstip van de laatste aanvraag
+cache_stats = {"hits": 0, "stale_served": 0, "misses": 0, "refreshes_queued": 0}
+
+# Alleen de leader draait de achtergrond verversing als de cache gedeeld is
+refresher_lock = LeaderLock(LEADER_LOCK_PATH) if event_cache.shared else SoloLeaderLock()
+
+def _background_scrape(event_id):
+    """Ververs een event op de worker pool"""
+    try:
+        # Bij een gedeelde cache claimt hoogstens één worker de verversing
+        if not event_cache.claim_refresh(event_id, REFRESH_CLAIM_TTL):
+            return
+        try:
+            event_flight.do(event_id, lambda: _scrape_and_store(event_id))
+        finally:
+            event_cache.release_refresh(event_id)
+    except Exception as e:
+        logger.error(f"Fout bij achtergrond verversing event {event_id}: {str(e)}")
+    finally:
+        with cache_lock:
+            pending_refreshes.discard(event_id)
+
+def schedule_refresh(event_id):
+    """Zet een verversing in de wachtrij, tenzij er al een gepland staat"""
+    with cache_lock:
+        if event_id in pending_refreshes:
+            return False
+        pending_refreshes.add(event_id)
+        cache_stats["refreshes_queued"] += 1
+    refresh_executor.submit(_background_scrape, event_id)
+    return True
+
+def hot_event_ids():
+    """
+    Het huidige event plus de HOT_EVENT_MAX meest recent opgevraagde events
+    binnen HOT_EVENT_WINDOW, zodat een crawler over /event/1..N niet N
+    achtergrond verversingen veroorzaakt
+    """
+    cutoff = time.time() - HOT_EVENT_WINDOW
+    current = current_event_id()
+    ids = [current]
+    recent = [k for k in event_cache.requested_since(cutoff) if k != current]
+    ids.extend(recent[:HOT_EVENT_MAX])
+    # Events met open streams blijven altijd hot
+    ids.extend(k for k in change_feed.subscribed_ids() if k not in ids)
+    return ids
+
+def _mark_requested(event_id):
+    """Registreer een aanvraag, hoogstens eens per REQUEST_MARK_INTERVAL per event"""
+    now = time.time()
+    with cache_lock:
+        if now - recent_requests.get(event_id, 0) < REQUEST_MARK_INTERVAL:
+            return
+        recent_requests[event_id] = now
+    event_cache.mark_requested(event_id, now)
+
+def is_servable_from_cache(event_id):
+    """True als get_event_with_cache voor dit event niet op een scrape hoeft te wachten"""
+    cached = event_cache.get(event_id)
+    if not cached:
+        return False
+    return (datetime.now() - cached[0]).total_seconds() < CACHE_HARD_TTL
+
 def get_event_with_cache(event_id):
     """Haal event op met caching voor betere prestaties"""
-    global event_cache, last_check_time
-    
     current_time = datetime.now()
     
+    cached = event_cache.get(event_id)
+    
     # Als er een geldige cache is, gebruik die
-    if event_id in event_cache:
-        cache_time, cached_event = event_cache[event_id]
-        # Als de cache nog vers is (< 5 minuten oud)
-        if (current_time - cache_time).total_seconds() < CACHE_EXPIRY:
-            logger.info(f"Cache hit voor event {event_id}")
+    if cached:
+        # Alleen bestaande events tellen als aanvraag (en worden dus hot)
+        _mark_requested(event_id)
+        cache_time, cached_event = cached
+        age = (current_time - cache_time).total_seconds()
+        # Als de cache nog vers is (< soft TTL)
+        if age < CACHE_SOFT_TTL:
+            with cache_lock:
+                cache_stats["hits"] += 1
+            # Debug niveau en lazy formatting: dit is het hot path
+            logger.debug("Cache hit voor event %s", event_id)
+            return cached_event
+        # Verouderd maar bruikbaar: direct serveren en op de achtergrond verversen
+        if age < CACHE_HARD_TTL:
+            with cache_lock:
+                cache_stats["stale_served"] += 1
+            schedule_refresh(event_id)
             return cached_event
     
-    # Anders, haal verse data op
+    with cache_lock:
+        cache_stats["misses"] += 1
+    
+    # Anders, haal verse data op (of uit het archief). Loopt er al een scrape
+    # voor dit event, dan sluiten we daarbij aan; hebben we een verlopen kopie,
+    # dan krijgen de wachtenden die meteen in plaats van op de scrape te wachten.
     try:
-        logger.info(f"Cache miss voor event {event_id}, ophalen verse data")
-        event = scrape_event_fmid(event_id)
-        # Update de cache
-        event_cache[event_id] = (current_time, event)
-        last_check_time = current_time
-        
-        # Houd de cache-grootte beperkt
-        if len(event_cache) > 5:
-            # Verwijder de oudste entry
-            oldest_id = min(event_cache.keys(), 
-                           key=lambda k: event_cache[k][0])
-            del event_cache[oldest_id]
-            
-        return event
+        if cached:
+            event = event_flight.do(event_id, lambda: _load_or_scrape(event_id), stale=cached[1])
+        else:
+            event = event_flight.do(event_id, lambda: _load_or_scrape(event_id))
     except Exception as e:
         logger.error(f"Fout bij ophalen event {event_id}: {str(e)}")
         # Als er een fout optreedt en we hebben een verouderde cache, gebruik die als fallback
-        if event_id in event_cache:
+        cached = event_cache.get(event_id)
+        if cached:
             logger.info(f"Gebruik verouderde cache als fallback voor event {event_id}")
-            return event_cache[event_id][1]
+            return cached[1]
         raise
+    _mark_requested(event_id)
+    return event
 
-def refresh_current_event():
-    """Ververs de huidige event data in de achtergrond"""
+# Bepaalt per event wanneer de achtergrond verversing opnieuw moet draaien
+refresh_scheduler = RefreshScheduler()
+REFRESHER_MAX_SLEEP = 60  # Hot events opnieuw bekijken en leader status controleren
+
+def refresh_event(event_id):
+    """Ververs één event en plan de volgende verversing op basis van de event status"""
     try:
-        event = get_event_with_cache(DEFAULT_CURRENT_EVENT_ID)
-        logger.info(f"Event {DEFAULT_CURRENT_EVENT_ID} ververst: {event.name}, status: {event.status}")
+        if not event_cache.claim_refresh(event_id, REFRESH_CLAIM_TTL):
+            # Een andere worker ververst dit event al; probeer het later opnieuw
+            refresh_scheduler.defer(event_id, REFRESH_CLAIM_TTL)
+            return
+        try:
+            event = event_flight.do(event_id, lambda: _scrape_and_store(event_id))
+        finally:
+            event_cache.release_refresh(event_id)
+        logger.info(f"Event {event_id} ververst: {event.name}, status: {event.status}")
         
         # Controleer en log live gevechten
+        live_detected = False
         for segment in event.card_segments:
             for fight in segment.fights:
                 if is_fight_live(fight, segment, event):
-                    fighter_names = [fs.fighter.name for fs in fight.fighters_stats]
+                    live_detected = True
+                    fighter_names = fight.fighter_names
                     fighters_str = " vs. ".join(fighter_names)
                     logger.info(f"LIVE GEVECHT GEDETECTEERD: {fighters_str} in {segment.name}")
+        
+        publish_event_changes(event_id, event)
+        refresh_scheduler.record_success(event_id, compute_refresh_interval(event, live_detected))
     except Exception as e:
-        logger.error(f"Fout bij verversen event data: {str(e)}")
+        delay = refresh_scheduler.record_failure(event_id)
+        logger.error(f"Fout bij verversen event {event_id}: {str(e)}, nieuwe poging over {delay}s")
+
+def publish_event_changes(event_id, event):
+    """Stuur wijzigingen (resultaten, live status, gestarte segmenten) naar de change feed"""
+    changes = change_feed.publish(event_id, event_state(event, is_fight_live))
+    if changes:
+        logger.info(f"{len(changes)} wijziging(en) gepubliceerd voor event {event_id}")
+    return changes
+
+def publish_from_shared_cache():
+    """Niet-leaders: publiceer wijzigingen die de leader in de gedeelde cache gezet heeft"""
+    for event_id in change_feed.subscribed_ids():
+        cached = event_cache.get(event_id)
+        if cached:
+            publish_event_changes(event_id, cached[1])
+
+def refresh_current_event():
+    """Ververs de huidige event data in de achtergrond"""
+    refresh_event(current_event_id())
+
+def _first_refresh_due(event_id):
+    """
+    Een event dat (bv. door een cache miss) net vers in de cache staat, pas
+    inplannen als zijn verversingsinterval verstreken is; anders direct.
+    """
+    cached = event_cache.get(event_id)
+    if not cached:
+        return None
+    cache_time, event = cached
+    return cache_time.timestamp() + compute_refresh_interval(event)
+
+def refresh_due_events():
+    """Plan alle hot events in en ververs de events die aan de beurt zijn"""
+    hot_ids = set(hot_event_ids())
+    for event_id in hot_ids:
+        if not refresh_scheduler.is_scheduled(event_id):
+            refresh_scheduler.ensure(event_id, _first_refresh_due(event_id))
+    for event_id in refresh_scheduler.take_due():
+        if event_id not in hot_ids:
+            # Niet meer opgevraagd: niet langer verversen
+            refresh_scheduler.forget(event_id)
+            continue
+        refresh_executor.submit(refresh_event, event_id)
 
 def start_background_refresh():
     """Start een achtergrondthread om event data te verversen"""
     def refresh_thread():
         while True:
-            refresh_current_event()
-            time.sleep(CACHE_EXPIRY)  # Wacht 5 minuten tussen verversingen
+            # Met een gedeelde cache ververst alleen de leader; de anderen
+            # proberen periodiek de leader rol over te nemen
+            if not refresher_lock.try_acquire():
+                if change_feed.subscribed_ids():
+                    publish_from_shared_cache()
+                    time.sleep(FEED_POLL_INTERVAL)
+                else:
+                    time.sleep(LEADER_RETRY_INTERVAL)
+                continue
+            refresh_due_events()
+            # Slaap tot het eerstvolgende event aan de beurt is
+            wait = refresh_scheduler.seconds_until_next(REFRESHER_MAX_SLEEP)
+            time.sleep(min(REFRESHER_MAX_SLEEP, max(1.0, wait)))
             
     thread = threading.Thread(target=refresh_thread, daemon=True)
     thread.start()
     logger.info("Achtergrond verversing gestart")
 
-# Start de achtergrond verversing als we in een productie omgeving zijn
-if not os.environ.get('FLASK_DEBUG'):
+_last_snapshot_signature = None
+
+def write_cache_snapshot():
+    """Schrijf de cache naar SNAPSHOT_PATH als er sinds de vorige keer iets veranderd is"""
+    global _last_snapshot_signature
+    if not SNAPSHOT_PATH:
+        return
+    items = event_cache.items()
+    signature = tuple(sorted((event_id, fetched_at) for event_id, (fetched_at, _) in items))
+    if not items or signature == _last_snapshot_signature:
+        return
+    try:
+        size = save_snapshot(SNAPSHOT_PATH, items)
+        _last_snapshot_signature = signature
+        logger.debug("Cache snapshot geschreven: %s events, %s bytes", len(items), size)
+    except Exception as e:
+        logger.error(f"Fout bij schrijven cache snapshot: {str(e)}")
+
+def load_cache_snapshot():
+    """
+    Vul de cache vanuit de snapshot. Entries behouden hun echte fetched_at, maar
+    minstens net voorbij de soft TTL, zodat het eerste request ze direct serveert
+    en een verversing op de achtergrond start. Entries ouder dan de hard TTL
+    zouden toch niet geserveerd worden en worden overgeslagen.
+    """
+    if not SNAPSHOT_PATH:
+        return 0
+    entries = load_snapshot(SNAPSHOT_PATH, min(SNAPSHOT_MAX_AGE, CACHE_HARD_TTL))
+    stale_time = datetime.now() - timedelta(seconds=CACHE_SOFT_TTL + 1)
+    loaded = 0
+    for event_id, fetched_at, event in entries:
+        if event_cache.get(event_id):
+            continue
+        event = to_snapshot(event)
+        event_cache.set(event_id, min(datetime.fromtimestamp(fetched_at), stale_time), event)
+        live_indexes.get(event)
+        fighter_index.update(event_id, event)
+        loaded += 1
+    if loaded:
+        logger.info(f"{loaded} events uit cache snapshot geladen")
+    return loaded
+
+def start_snapshot_writer():
+    """Start een achtergrondthread die de cache periodiek naar schijf schrijft"""
+    def snapshot_thread():
+        while True:
+            time.sleep(SNAPSHOT_INTERVAL)
+            if refresher_lock.is_leader:
+                write_cache_snapshot()
+    
+    thread = threading.Thread(target=snapshot_thread, daemon=True)
+    thread.start()
+    atexit.register(write_cache_snapshot)
+
+_background_pid = None
+_background_lock = threading.Lock()
+
+def background_services_active():
+    return _background_pid == os.getpid()
+
+def start_background_services():
+    """
+    Start de achtergrond verversing en snapshot writer, hoogstens één keer per
+    proces. Wordt na de fork aangeroepen (gunicorn post_worker_init hook of het
+    eerste request), zodat de threads in de worker zelf draaien, ook met --preload.
+    """
+    global _background_pid
+    # Alleen in een productie omgeving
+    if os.environ.get('FLASK_DEBUG'):
+        return False
+    with _background_lock:
+        if _background_pid == os.getpid():
+            return False
+        _background_pid = os.getpid()
     start_background_refresh()
+    if SNAPSHOT_PATH:
+        start_snapshot_writer()
+    return True
 
 def is_fight_live(fight, segment, event):
     """
@@ -104,276 +544,728 @@ def is_fight_live(fight, segment, event):
     - Gevechtsresultaat check
     - Segment tijdcheck
     - Volgorde van gevechten
+    
+    De volgorde- en resultaatchecks zijn vooraf berekend in de LiveIndex van het
+    event, zodat dit per gevecht O(1) is.
     """
     try:
-        # Als het gevecht een resultaat heeft, is het voorbij
-        if fight.result and fight.result.method:
+        index = live_indexes.get(event)
+        
+        # Alleen het eerste gevecht zonder resultaat in een segment kan live zijn
+        if not index.is_live_candidate(fight):
             return False
         
-        # Check event status - als het "In Progress" is, is er een fight bezig
-        if event.status == "In Progress":
+        # Als het segment nog niet begonnen is, is het gevecht niet live
+        if index.in_progress:
             current_time = datetime.now(pytz.UTC)
-            
-            # Als het segment nog niet begonnen is, is het gevecht niet live
             if segment.start_time and segment.start_time > current_time:
                 return False
+        
+        # Probeer direct de UFC site te checken voor extra verificatie
+        try:
+            direct_check = check_ufc_site_for_live_status(fight)
+            if direct_check is not None:
+                return direct_check
+        except Exception:
+            pass
+        
+        # Als aan alle voorwaarden is voldaan, is dit gevecht waarschijnlijk live
+        return True
+    except Exception:
+        # Als er een fout optreedt, gaan we ervan uit dat het gevecht niet live is
+        return False
+
+def check_ufc_site_for_live_status(fight):
+    """
+    Probeert van de UFC site te bepalen of een gevecht LIVE is.
+    De pagina wordt via de gedeelde live_probe hoogstens één keer per
+    LIVE_PROBE_INTERVAL opgehaald; alle andere aanroepen gebruiken de snapshot.
+    """
+    # Als de site aangeeft dat er een live event is,
+    # en dit gevecht heeft nog geen resultaat,
+    # dan is het waarschijnlijk dit gevecht dat live is
+    return live_probe.is_live()
+
+def live_signature(event):
+    """Live status van de live kandidaten; onderdeel van de versie van een gerenderde response"""
+    index = live_indexes.get(event)
+    return tuple(is_fight_live(fight, segment, event) for segment, fight in index.live_fights(event))
+
+def render_home_text(event, schedule=None, updated_at=None):
+    """
+    Tekst weergave van een event voor de home pagina. `updated_at` is het
+    moment waarop de data opgehaald is (fetched_at van de cache); de body hangt
+    zo alleen van de data af en niet van het moment van renderen.
+    """
+    schedule = schedule or event_schedule.get()
+    updated_at = updated_at or datetime.now()
+    # Maak een eenvoudige tekst weergave
+    output = []
+    output.append("\n📅 UFC Event: {}\n".format(event.name))
+    output.append("📊 Status: {}\n".format(event.status))
+    
+    found_live_fight = False
+    
+    for segment in event.card_segments:
+        output.append("🎬 {} - Start: {}".format(segment.name, segment.start_time))
+        for fight in segment.fights:
+            fighter_names = fight.fighter_names
+            fighters_str = " vs. ".join(fighter_names)
+            output.append(" 🥋 " + fighters_str)
             
-            # Vind index van het huidige gevecht
-            fight_index = -1
-            for i, f in enumerate(segment.fights):
-                if f == fight:
-                    fight_index = i
-                    break
+            # Controleer de live status
+            is_live = is_fight_live(fight, segment, event)
             
-            if fight_index == -1:
-                return False
-                
-            # Controleer voorgaande gevechten - moeten allemaal klaar zijn
-            all_previous_completed = True
-            for i in range(0, fight_index):
-                prev_fight = segment.fights[i]
-                if not prev_fight.result or not prev_fight.result.method:
-                    all_previous_completed = False
-                    break
+            if fight.result and fight.result.method:
+                output.append("   ✅ Result: {}".format(fight.result.method))
+                output.append("   ⏱️  Ended in round {} at {}".format(
+                    fight.result.ending_round, fight.result.ending_time))
+            elif is_live:
+                output.append("   🔴 LIVE NOW")
+                found_live_fight = True
+            else:
+                output.append("   🕒 Status: Not yet finished")
             
-            if not all_previous_completed:
-                return False
-                
-            # Controleer volgende gevechten - als een volgende al klaar is, dan is dit niet live
-            if fight_index < len(segment.fights) - 1:
-                next_fight = segment.fights[fight_index + 1]
-                if next_fight.result and next_fight.result.method:
-                    return False
+            output.append("-" * 50)
+    
+    # Voeg informatie over andere endpoints toe
+    output.append("\n🔗 Andere endpoints:")
+    output.append(f"  - /event/{schedule.last} (Vorig event)")
+    output.append(f"  - /event/{schedule.current} (Huidig event)")
+    output.append(f"  - /event/{schedule.next} (Volgend event)")
+    output.append("  - /debug/live-detection (Test live detection)")
+    output.append("  - /debug/simulate-live (Simuleer live event)")
+    output.append(f"  - /events?ids={schedule.last},{schedule.current},{schedule.next} (Meerdere events in één request)")
+    output.append(f"  - /event/{schedule.current}?only=live,results&fields=fighters,result,status (Alleen live gevechten en resultaten)")
+    output.append(f"  - /event/{schedule.current}/stream (Live wijzigingen via Server-Sent Events)")
+    output.append(f"  - /event/{schedule.current}/fighters (Alle fighters op de kaart)")
+    output.append(f"  - /fighter/<naam-of-slug>?event={schedule.current} (Fighter profiel en gevechten)")
+    output.append("  - /archive/finishes?method=KO&last=10 (Finishes uit het archief)")
+    output.append("  - /archive/fighter/<naam-of-slug> (Alle gearchiveerde gevechten van een fighter)")
+    output.append("  - /api/status (API status en cache info)")
+    output.append("  - /metrics (Prometheus metrics)")
+    
+    # Als we geen live gevecht gevonden hebben, voeg een notitie toe
+    if not found_live_fight and event.status == "In Progress":
+        output.append("\n⚠️ Event is 'In Progress' maar geen specifiek live gevecht geïdentificeerd.")
+    
+    # Voeg timestamp toe van het moment waarop de data opgehaald is
+    output.append("\n🕒 Last Updated: {}".format(updated_at.strftime("%Y-%m-%d %H:%M:%S UTC")))
+    
+    return "\n".join(output)
+
+def build_event_json(event):
+    """JSON structuur van een event voor /event/<id>"""
+    # Bereid de JSON data voor
+    result_json = {
+        "name": event.name,
+        "status": event.status,
+        "segments": []
+    }
+    
+    for segment in event.card_segments:
+        segment_data = {
+            "name": segment.name,
+            "start_time": str(segment.start_time),
+            "fights": []
+        }
+        
+        for fight in segment.fights:
+            fighter_names = fight.fighter_names
             
-            # Probeer direct de UFC site te checken voor extra verificatie
-            try:
-                direct_check = check_ufc_site_for_live_status(fight)
-                if direct_check is not None:
-                    return direct_check
-            except:
-                pass
-                
-            # Als aan alle voorwaarden is voldaan, is dit gevecht waarschijnlijk live
-            return True
+            fight_data = {
+                "fighters": fighter_names
+            }
             
-        # Als event status niet "In Progress" is, is er nog een alternatieve check
-        # Controleer of dit het eerste gevecht is zonder resultaat na een reeks gevechten met resultaten
-        fight_index = -1
-        for i, f in enumerate(segment.fights):
-            if f == fight:
-                fight_index = i
-                break
-                
-        if fight_index > 0:
-            # Alle voorgaande gevechten moeten afgelopen zijn
-            all_previous_completed = True
-            for i in range(0, fight_index):
-                if not segment.fights[i].result or not segment.fights[i].result.method:
-                    all_previous_completed = False
-                    break
-                    
-            if all_previous_completed:
-                # Probeer direct de UFC site te checken
-                try:
-                    direct_check = check_ufc_site_for_live_status(fight)
-                    if direct_check is not None:
-                        return direct_check
-                except:
-                    pass
-                
-                # Dit zou het huidige gevecht kunnen zijn, ook al zegt de API niet "In Progress"
-                return True
-                
-        return False
-    except:
-        # Als er een fout optreedt, gaan we ervan uit dat het gevecht niet live is
-        return False
+            if fight.result:
+                fight_data["result"] = {
+                    "method": fight.result.method,
+                    "ending_round": fight.result.ending_round,
+                    "ending_time": str(fight.result.ending_time)
+                }
+            elif is_fight_live(fight, segment, event):
+                fight_data["status"] = "LIVE NOW"
+            else:
+                fight_data["status"] = "Not yet finished"
+            
+            segment_data["fights"].append(fight_data)
+        
+        result_json["segments"].append(segment_data)
+    
+    return result_json
 
-def check_ufc_site_for_live_status(fight):
-    """Probeert direct van de UFC site te bepalen of een gevecht LIVE is"""
-    try:
-        # Haal de UFC evenement pagina op
-        response = requests.get("https://www.ufc.com/events", timeout=5)
-        if response.status_code == 200:
-            # Controleer of er "LIVE NOW" of soortgelijke indicaties zijn
-            if "LIVE NOW" in response.text or "LIVE EVENT" in response.text:
-                # Als de site aangeeft dat er een live event is, 
-                # en dit gevecht heeft nog geen resultaat,
-                # dan is het waarschijnlijk dit gevecht dat live is
-                return True
-    except:
-        pass
-    
-    # Als we hier komen, geen directe bevestiging
-    return None
-
-@app.route('/')
+def _split_param(value):
+    """Komma-gescheiden query parameter als gesorteerde tuple (stabiel als cache sleutel)"""
+    return tuple(sorted({part.strip() for part in (value or "").split(",") if part.strip()}))
+
+def parse_event_query(args):
+    """Projectie- en filterparameters van /event/<id>; ValueError bij ongeldige waarden"""
+    fields = _split_param(args.get('fields'))
+    unknown = set(fields) - set(FIGHT_FIELDS)
+    if unknown:
+        raise ValueError(f"Onbekende fields: {', '.join(sorted(unknown))} (kies uit {', '.join(FIGHT_FIELDS)})")
+    only = _split_param(args.get('only'))
+    unknown = set(only) - set(ONLY_FILTERS)
+    if unknown:
+        raise ValueError(f"Onbekende only filters: {', '.join(sorted(unknown))} (kies uit {', '.join(ONLY_FILTERS)})")
+    # Zonder since: alles sinds het begin van de feed; een versie van een ander proces geeft een reset
+    since = change_feed.parse_version(args.get('since'))
+    if since is None:
+        since = 0
+    segments = tuple(name.lower() for name in _split_param(args.get('segment')))
+    return fields, segments, only, since
+
+def changed_fight_keys(entries):
+    """(segment, fighters) van alle gevechten in change feed entries"""
+    return {
+        (change["segment"], tuple(change["fighters"]))
+        for _, changes, _ in entries for change in changes if "fighters" in change
+    }
+
+def _fight_matches(segment_name, fight, only, changed):
+    """only is een OF-filter: live, met resultaat, of gewijzigd (changed None = alles na een reset)"""
+    if "live" in only and fight.get("status") == "LIVE NOW":
+        return True
+    if "results" in only and "result" in fight:
+        return True
+    if "changed" in only and (changed is None or (segment_name, tuple(fight["fighters"])) in changed):
+        return True
+    return False
+
+def project_event_json(data, fields=(), segments=(), only=(), changed=None):
+    """Beperk build_event_json output tot de gevraagde segmenten, gevechten en velden"""
+    if not (fields or segments or only):
+        return data
+    projected = []
+    for segment in data["segments"]:
+        if segments and segment["name"].lower() not in segments:
+            continue
+        fights = []
+        for fight in segment["fights"]:
+            if only and not _fight_matches(segment["name"], fight, only, changed):
+                continue
+            fights.append({k: v for k, v in fight.items() if k in fields} if fields else fight)
+        if only and not fights:
+            continue
+        projected.append(dict(segment, fights=fights))
+    return dict(data, segments=projected)
+
+@bp.route('/')
 def home():
     try:
-        # Haal direct het huidige event op
-        event = get_event_with_cache(DEFAULT_CURRENT_EVENT_ID)
-        
-        # Maak een eenvoudige tekst weergave
-        output = []
-        output.append("\n📅 UFC Event: {}\n".format(event.name))
-        output.append("📊 Status: {}\n".format(event.status))
-        
-        found_live_fight = False
-        
-        for segment in event.card_segments:
-            output.append("🎬 {} - Start: {}".format(segment.name, segment.start_time))
-            for fight in segment.fights:
-                fighter_names = [fs.fighter.name for fs in fight.fighters_stats]
-                fighters_str = " vs. ".join(fighter_names)
-                output.append(" 🥋 " + fighters_str)
-                
-                # Controleer de live status
-                is_live = is_fight_live(fight, segment, event)
-                
-                if fight.result and fight.result.method:
-                    output.append("   ✅ Result: {}".format(fight.result.method))
-                    output.append("   ⏱️  Ended in round {} at {}".format(
-                        fight.result.ending_round, fight.result.ending_time))
-                elif is_live:
-                    output.append("   🔴 LIVE NOW")
-                    found_live_fight = True
-                else:
-                    output.append("   🕒 Status: Not yet finished")
-                
-                output.append("-" * 50)
-        
-        # Voeg informatie over andere endpoints toe
-        output.append("\n🔗 Andere endpoints:")
-        output.append("  - /event/1250 (Vorig event)")
-        output.append("  - /event/1251 (Huidig event)")
-        output.append("  - /event/1252 (Volgend event)")
-        output.append("  - /debug/live-detection (Test live detection)")
-        output.append("  - /debug/simulate-live (Simuleer live event)")
-        output.append("  - /api/status (API status en cache info)")
+        # Haal direct het huidige event op (volgens het event schema)
+        schedule = event_schedule.get()
+        event = get_event_with_cache(schedule.current)
+        cached = event_cache.get(schedule.current)
+        updated_at = cached[0] if cached else None
         
-        # Als we geen live gevecht gevonden hebben, voeg een notitie toe
-        if not found_live_fight and event.status == "In Progress":
-            output.append("\n⚠️ Event is 'In Progress' maar geen specifiek live gevecht geïdentificeerd.")
-        
-        # Voeg timestamp toe voor verse data
-        output.append("\n🕒 Last Updated: {}".format(datetime.now().strftime("%Y-%m-%d %H:%M:%S UTC")))
+        # Render alleen opnieuw als het event, de live status, het schema of het
+        # ophaalmoment veranderd is; zo is de ETag gelijk voor gelijke data
+        rendered = response_cache.get_or_render(
+            ('home', schedule.current), event, (live_signature(event), schedule[:3], updated_at),
+            lambda: RenderedResponse(render_home_text(event, schedule, updated_at), 'text/plain'))
         
         # Retourneer als plain text
-        return Response("\n".join(output), mimetype='text/plain')
+        return make_cached_response(rendered)
     except Exception as e:
         logger.error(f"Fout in home endpoint: {str(e)}")
         # Fallback naar JSON in geval van fouten
         return jsonify({
             "status": "online",
             "message": "UFC Data API is running",
-            "endpoints": [
-                "/event/1250",  # Laatste event (voorbeeld)
-                "/event/1251",  # Huidige event (voorbeeld)
-                "/event/1252",  # Volgende event (voorbeeld)
-            ],
+            "endpoints": [f"/event/{event_id}" for event_id in event_schedule.get()[:3]],
             "error": str(e)
         })
 
-@app.route('/event/<int:event_fmid>')
+@bp.route('/event/<int:event_fmid>')
 def get_event(event_fmid):
+    """
+    Event als JSON of MessagePack (?format= of de Accept header). Optioneel:
+    - fields=fighters,result,status: alleen deze velden per gevecht
+    - segment=Main Card: alleen deze segmenten (komma-gescheiden)
+    - only=live,results,changed: live gevechten, gevechten met een resultaat
+      en/of gevechten gewijzigd sinds change feed versie `since`
+    """
+    try:
+        fmt = choose_format(request.accept_mimetypes, request.args.get('format'))
+        fields, segments, only, since = parse_event_query(request.args)
+    except NotAcceptable as e:
+        return jsonify({"error": str(e)}), 406
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
     try:
         event = get_event_with_cache(event_fmid)
         
-        # Bereid de JSON data voor
-        result_json = {
-            "name": event.name,
-            "status": event.status,
-            "segments": []
-        }
+        if "changed" in only:
+            # Hangt af van `since`, dus niet in de response cache
+            version, reset, entries = change_feed.changes_since(event_fmid, since)
+            data = project_event_json(build_event_json(event), fields, segments, only,
+                                      None if reset else changed_fight_keys(entries))
+            data.update(version=change_feed.format_version(version), reset=reset)
+            rendered = RenderedResponse(*encode(data, fmt))
+        else:
+            rendered = response_cache.get_or_render(
+                ('event', event_fmid, fmt, fields, segments, only), event, live_signature(event),
+                lambda: RenderedResponse(*encode(
+                    project_event_json(build_event_json(event), fields, segments, only), fmt)))
         
-        for segment in event.card_segments:
-            segment_data = {
-                "name": segment.name,
-                "start_time": str(segment.start_time),
-                "fights": []
-            }
-            
-            for fight in segment.fights:
-                fighter_names = [fs.fighter.name for fs in fight.fighters_stats]
-                
-                fight_data = {
-                    "fighters": fighter_names
-                }
-                
-                if fight.result:
-                    fight_data["result"] = {
-                        "method": fight.result.method,
-                        "ending_round": fight.result.ending_round,
-                        "ending_time": str(fight.result.ending_time)
-                    }
-                elif is_fight_live(fight, segment, event):
-                    fight_data["status"] = "LIVE NOW"
+        return make_cached_response(rendered, vary='Accept, Accept-Encoding')
+    except CircuitOpenError as e:
+        # Geen cache en de upstream is ongezond: direct falen in plaats van wachten
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        logger.error(f"Fout in get_event endpoint voor event {event_fmid}: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@bp.route('/events')
+def get_events():
+    """Meerdere events in één response; cache misses worden parallel opgehaald"""
+    ids_param = request.args.get('ids')
+    if ids_param:
+        try:
+            event_ids = list(dict.fromkeys(int(i) for i in ids_param.split(',') if i.strip()))
+        except ValueError:
+            return jsonify({"error": "ids moet een komma-gescheiden lijst van event IDs zijn"}), 400
+    else:
+        event_ids = list(event_schedule.get()[:3])
+    if len(event_ids) > BATCH_MAX_IDS:
+        return jsonify({"error": f"Maximaal {BATCH_MAX_IDS} events per request"}), 400
+    
+    results = {}
+    errors = {}
+    
+    def resolve(event_id):
+        event = get_event_with_cache(event_id)
+        return build_event_json(event)
+    
+    # Cache hits direct, misses parallel op de batch pool
+    futures = {}
+    for event_id in event_ids:
+        if is_servable_from_cache(event_id):
+            try:
+                results[str(event_id)] = resolve(event_id)
+            except Exception as e:
+                errors[str(event_id)] = str(e)
+        else:
+            futures[event_id] = batch_executor.submit(resolve, event_id)
+    
+    for event_id, future in futures.items():
+        try:
+            results[str(event_id)] = future.result()
+        except Exception as e:
+            logger.error(f"Fout bij ophalen event {event_id} in batch: {str(e)}")
+            errors[str(event_id)] = str(e)
+    
+    return jsonify({
+        "events": {str(i): results[str(i)] for i in event_ids if str(i) in results},
+        "errors": errors
+    })
+
+def get_fighter_profile(slug, url):
+    """Fighter profiel uit de TTL cache; bij een miss hoogstens één lopende scrape per fighter"""
+    profile = fighter_profiles.get(slug)
+    if profile is not None:
+        return profile
+    
+    def fetch():
+        # Kort geleden mislukt: niet opnieuw scrapen tot de failure TTL verstreken is
+        error = fighter_profiles.get_failure(slug)
+        if error is not None:
+            raise ProfileLookupFailed(error)
+        try:
+            fetched = to_jsonable(upstreams['fighter_profiles'].call(scrape_fighter_url, url))
+        except CircuitOpenError:
+            # Zegt niets over deze fighter; niet als mislukte lookup onthouden
+            raise
+        except Exception as e:
+            fighter_profiles.set_failure(slug, str(e))
+            raise
+        fighter_profiles.set(slug, fetched)
+        return fetched
+    
+    try:
+        return fighter_flight.do(slug, fetch)
+    except Exception:
+        # Een verlopen profiel is beter dan niets
+        stale = fighter_profiles.get(slug, allow_expired=True)
+        if stale is not None:
+            logger.info(f"Gebruik verlopen profiel als fallback voor fighter {slug}")
+            return stale
+        raise
+
+@bp.route('/fighter/<fighter_id>')
+def get_fighter(fighter_id):
+    """
+    Fighter profiel plus zijn gevechten in de gecachte events. Met ?event=<id>
+    alleen de gevechten op die kaart; met ?profile=0 wordt UFC.com nooit
+    aangesproken en komt alles uit de index (en een eventueel gecacht profiel).
+    Een fighter die niet in de index staat wordt alleen met ?fetch=1 op
+    UFC.com opgezocht, zodat willekeurige slugs geen upstream scrapes worden.
+    """
+    slug = fighter_slug(fighter_id)
+    if not slug:
+        return jsonify({"error": "Ongeldige fighter naam of slug"}), 400
+    event_id = request.args.get('event')
+    try:
+        event_id = int(event_id) if event_id else None
+    except ValueError:
+        return jsonify({"error": "event moet een event ID zijn"}), 400
+    
+    try:
+        if event_id is not None:
+            fighter_index.update(event_id, get_event_with_cache(event_id))
+        # Een andere worker kan events in de gedeelde cache gezet hebben; alleen
+        # de (event_id, fetched_at) lijst lezen, en gewijzigde events los laden
+        fighter_index.sync(event_cache.versions(), event_cache.get)
+    except Exception as e:
+        logger.error(f"Fout bij bijwerken fighter index voor {slug}: {str(e)}")
+    
+    indexed = fighter_index.lookup(slug, event_id)
+    data = indexed or {"slug": slug, "name": None, "url": athlete_url(None, slug), "fights": []}
+    
+    if request.args.get('profile', '1').lower() in ('0', 'false', 'no'):
+        data["profile"] = fighter_profiles.get(slug, allow_expired=True)
+        return jsonify(data)
+    
+    if indexed is None and request.args.get('fetch', '0').lower() not in ('1', 'true', 'yes'):
+        profile = fighter_profiles.get(slug, allow_expired=True)
+        if profile is None:
+            return jsonify({
+                "error": f"Fighter '{slug}' staat niet op een gecachte kaart; gebruik ?fetch=1 om UFC.com te raadplegen"
+            }), 404
+        data["profile"] = profile
+        return jsonify(data)
+    
+    try:
+        data["profile"] = get_fighter_profile(slug, data["url"])
+    except Exception as e:
+        logger.error(f"Fout bij ophalen fighter {slug}: {str(e)}")
+        if indexed is None:
+            return jsonify({"error": str(e)}), 502
+        data["profile"] = None
+        data["profile_error"] = str(e)
+    return jsonify(data)
+
+@bp.route('/event/<int:event_fmid>/fighters')
+def get_event_fighters(event_fmid):
+    """Alle fighters op een kaart met hun gevechten, volledig uit de cache en de index"""
+    try:
+        event = get_event_with_cache(event_fmid)
+        fighter_index.update(event_fmid, event)
+        fighters = fighter_index.card(event_fmid) or []
+        for fighter in fighters:
+            fighter["profile"] = fighter_profiles.get(fighter["slug"], allow_expired=True)
+        return jsonify({
+            "event_id": event_fmid,
+            "event_name": event.name,
+            "fighters": fighters
+        })
+    except Exception as e:
+        logger.error(f"Fout in fighters endpoint voor event {event_fmid}: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+def _archive_response(query):
+    """Voer een archief query uit en geef de resultaten met de querytijd terug"""
+    if event_archive is None:
+        return jsonify({"error": "Archief is uitgeschakeld (UFC_ARCHIVE_PATH)"}), 503
+    try:
+        # sqlite leest LIMIT -1 als 'geen limiet'; daarom ook een ondergrens
+        limit = max(1, min(ARCHIVE_MAX_LIMIT, int(request.args.get('limit', 100))))
+        start = time.perf_counter()
+        fights = query(limit)
+        return jsonify({
+            "fights": fights,
+            "count": len(fights),
+            "query_ms": round((time.perf_counter() - start) * 1000, 3)
+        })
+    except ValueError:
+        return jsonify({"error": "limit, round en last moeten getallen zijn"}), 400
+    except Exception as e:
+        logger.error(f"Fout in archief query: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@bp.route('/archive/finishes')
+def archive_finishes():
+    """Finishes (geen beslissing) uit het archief; filters: method, round, last (laatste N events)"""
+    def query(limit):
+        ending_round = request.args.get('round')
+        last_events = request.args.get('last')
+        return event_archive.finishes(
+            method=request.args.get('method'),
+            ending_round=int(ending_round) if ending_round else None,
+            last_events=max(1, int(last_events)) if last_events else None,
+            limit=limit)
+    return _archive_response(query)
+
+@bp.route('/archive/fighter/<fighter_id>')
+def archive_fighter(fighter_id):
+    """Alle gearchiveerde gevechten van een fighter, nieuwste eerst"""
+    return _archive_response(lambda limit: event_archive.fighter_fights(fighter_id, limit=limit))
+
+def _register_callback_metrics():
+    """Metrics die bij het scrapen uit bestaande tellers gelezen worden"""
+    metrics.callback(
+        'ufc_live_probe_events', 'Aanroepen van check_ufc_site_for_live_status per uitkomst',
+        lambda: {(k,): v for k, v in live_probe.stats().items()
+                 if k in ("requests_served", "probes_avoided", "fetches", "not_modified", "errors")},
+        kind="counter", labelnames=('result',))
+    metrics.callback(
+        'ufc_event_cache_requests', 'Event cache aanvragen per uitkomst (hit, stale_served, miss)',
+        lambda: {("hit",): cache_stats["hits"], ("stale_served",): cache_stats["stale_served"],
+                 ("miss",): cache_stats["misses"]},
+        kind="counter", labelnames=('result',))
+    metrics.callback(
+        'ufc_event_cache_refreshes_queued', 'Achtergrond verversingen ingepland door stale hits',
+        lambda: cache_stats["refreshes_queued"], kind="counter")
+    metrics.callback(
+        'ufc_event_cache_evictions', 'Verwijderde entries uit de event cache',
+        lambda: event_cache.stats().get("evictions"), kind="counter")
+    metrics.callback(
+        'ufc_event_cache_entries', 'Aantal events in de cache',
+        lambda: event_cache.stats().get("entries"))
+    metrics.callback(
+        'ufc_event_cache_bytes', 'Geschatte grootte van de event cache in bytes',
+        lambda: event_cache.stats().get("estimated_bytes"))
+    metrics.callback(
+        'ufc_single_flight_coalesced', 'Scrapes die bij een lopende aanroep aansloten',
+        lambda: event_flight.totals()["coalesced"], kind="counter")
+    metrics.callback(
+        'ufc_refresher_lag_seconds', 'Hoe ver de laatst gestarte verversingen achter liepen op schema',
+        lambda: refresh_scheduler.lag_seconds)
+    metrics.callback(
+        'ufc_refresher_leader', '1 als dit proces de achtergrond verversing draait',
+        lambda: 1 if refresher_lock.is_leader else 0)
+    metrics.callback(
+        'ufc_upstream_circuit_state', 'Circuit breaker per upstream (0 = closed, 1 = half open, 2 = open)',
+        lambda: {(name,): STATE_VALUES[client.breaker.state] for name, client in upstreams.items()},
+        labelnames=('upstream',))
+    metrics.callback(
+        'ufc_upstream_rejected', 'Aanroepen die door een open circuit breaker direct faalden',
+        lambda: {(name,): client.stats()["rejected"] for name, client in upstreams.items()},
+        kind="counter", labelnames=('upstream',))
+    metrics.callback(
+        'ufc_upstream_retries', 'Retries uit het globale retry budget',
+        lambda: retry_budget.retries, kind="counter")
+    metrics.callback(
+        'ufc_stream_subscribers', 'Open SSE/long-poll verbindingen',
+        lambda: sum(v["subscribers"] for v in change_feed.stats().values()))
+
+_register_callback_metrics()
+
+@bp.before_app_request
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+
+@bp.after_app_request
+def _record_request_metrics(response):
+    start = g.get('request_start')
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_LATENCY.observe(time.perf_counter() - start,
+                                route=route, method=request.method, status=response.status_code)
+    return response
+
+@bp.route('/metrics')
+def prometheus_metrics():
+    """Metrics in het Prometheus tekstformaat"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def _acquire_stream_slot():
+    """Probeer een stream plaats te krijgen zonder te wachten"""
+    return stream_slots is not None and stream_slots.acquire(blocking=False)
+
+@bp.route('/event/<int:event_fmid>/stream')
+def stream_event(event_fmid):
+    """Server-Sent Events stream met alleen de wijzigingen van een event"""
+    if not _acquire_stream_slot():
+        # Elke stream houdt een thread bezet; vol is vol, anders blokkeren ook cache hits
+        with cache_lock:
+            stream_stats["rejected_streams"] += 1
+        response = jsonify({
+            "error": "Maximum aantal live streams op deze worker bereikt",
+            "fallback": f"/event/{event_fmid}/changes",
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = str(STREAM_RETRY_AFTER)
+        return response
+    
+    released = threading.Event()
+    def release_slot():
+        if not released.is_set():
+            released.set()
+            stream_slots.release()
+    
+    try:
+        event = get_event_with_cache(event_fmid)
+    except Exception as e:
+        release_slot()
+        logger.error(f"Fout in stream endpoint voor event {event_fmid}: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    
+    # Zorg dat er een basislijn is waartegen wijzigingen berekend worden
+    publish_event_changes(event_fmid, event)
+    
+    since = change_feed.parse_version(request.headers.get('Last-Event-ID') or request.args.get('since'))
+    if since is None:
+        since = change_feed.current_version(event_fmid)
+    
+    def generate():
+        change_feed.subscribe(event_fmid)
+        try:
+            version = since
+            hello = json.dumps({"event_id": event_fmid, "version": change_feed.format_version(version)})
+            yield f"retry: 5000\nevent: hello\ndata: {hello}\n\n".encode('utf-8')
+            while True:
+                new_version, reset, entries = change_feed.wait(event_fmid, version, STREAM_KEEPALIVE)
+                if reset:
+                    # Te ver achter (of een versie van een andere worker): de client
+                    # moet /event/<id> opnieuw ophalen
+                    token = change_feed.format_version(new_version)
+                    data = json.dumps({"version": token})
+                    yield f"id: {token}\nevent: reset\ndata: {data}\n\n".encode('utf-8')
+                elif entries:
+                    for _, _, frame in entries:
+                        yield frame
                 else:
-                    fight_data["status"] = "Not yet finished"
-                
-                segment_data["fights"].append(fight_data)
-            
-            result_json["segments"].append(segment_data)
+                    _mark_requested(event_fmid)
+                    yield b": keepalive\n\n"
+                version = new_version
+        finally:
+            change_feed.unsubscribe(event_fmid)
+    
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+    # Ook als de generator nooit gestart is, geeft de WSGI server de plaats vrij bij het sluiten
+    response.call_on_close(release_slot)
+    return response
+
+@bp.route('/event/<int:event_fmid>/changes')
+def event_changes(event_fmid):
+    """Long-poll fallback: wacht tot er wijzigingen na versie `since` zijn"""
+    try:
+        event = get_event_with_cache(event_fmid)
+        publish_event_changes(event_fmid, event)
         
-        return jsonify(result_json)
+        since = change_feed.parse_version(request.args.get('since'))
+        if since is None:
+            return jsonify({
+                "version": change_feed.format_version(change_feed.current_version(event_fmid)),
+                "reset": False,
+                "changes": [],
+            })
+        
+        timeout = min(request.args.get('timeout', LONG_POLL_TIMEOUT, type=float), LONG_POLL_TIMEOUT)
+        if _acquire_stream_slot():
+            change_feed.subscribe(event_fmid)
+            try:
+                version, reset, entries = change_feed.wait(event_fmid, since, timeout)
+            finally:
+                change_feed.unsubscribe(event_fmid)
+                stream_slots.release()
+            retry_after = None
+        else:
+            # Alle plaatsen bezet: niet wachten maar direct antwoorden; de client pollt opnieuw
+            with cache_lock:
+                stream_stats["immediate_polls"] += 1
+            version, reset, entries = change_feed.changes_since(event_fmid, since)
+            retry_after = STREAM_RETRY_AFTER if not entries and not reset else None
+        
+        response = jsonify({
+            "version": change_feed.format_version(version),
+            "reset": reset,
+            "changes": [change for _, changes, _ in entries for change in changes]
+        })
+        if retry_after:
+            response.headers['Retry-After'] = str(retry_after)
+        return response
     except Exception as e:
-        logger.error(f"Fout in get_event endpoint voor event {event_fmid}: {str(e)}")
+        logger.error(f"Fout in changes endpoint voor event {event_fmid}: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/status')
+@bp.route('/api/status')
 def api_status():
     """Endpoint om API status en cache informatie te tonen"""
-    global event_cache, last_check_time
+    cache_items = event_cache.items()
     
     cache_info = []
-    for event_id, (cache_time, event) in event_cache.items():
+    for event_id, (cache_time, event) in cache_items:
         age = (datetime.now() - cache_time).total_seconds()
         cache_info.append({
             "event_id": event_id,
             "event_name": event.name,
             "cache_age_seconds": round(age),
-            "fresh": age < CACHE_EXPIRY
+            "fresh": age < CACHE_SOFT_TTL,
+            "servable": age < CACHE_HARD_TTL
         })
     
     return jsonify({
         "status": "online",
         "last_check": last_check_time.isoformat() if last_check_time else None,
         "cache_expiry_seconds": CACHE_EXPIRY,
+        "cache_soft_ttl_seconds": CACHE_SOFT_TTL,
+        "cache_hard_ttl_seconds": CACHE_HARD_TTL,
+        "cache_stats": dict(cache_stats),
+        "hot_events": hot_event_ids(),
+        "cache_backend": type(event_cache).__name__,
+        "cache_backend_stats": event_cache.stats(),
+        "refresh_leader": refresher_lock.is_leader,
+        "refresh_schedule": refresh_scheduler.stats(),
+        "live_index_builds": live_indexes.builds,
+        "fighter_index": fighter_index.stats(),
+        "fighter_profiles": fighter_profiles.stats(),
+        "archive": event_archive.stats() if event_archive else None,
+        "response_cache": response_cache.stats(),
+        "change_feeds": change_feed.stats(),
+        "streams": dict(stream_stats, max_per_worker=MAX_STREAMS),
         "cached_events": cache_info,
         "version": "1.2.0",
-        "background_refresh_active": not os.environ.get('FLASK_DEBUG')
+        "background_refresh_active": background_services_active(),
+        "live_probe": live_probe.stats(),
+        "schedule": event_schedule.stats(),
+        "upstream": {
+            "circuit_breakers": {name: client.stats() for name, client in upstreams.items()},
+            "retry_budget": retry_budget.stats()
+        },
+        "single_flight": event_flight.stats()
     })
 
-@app.route('/debug/live-detection')
+@bp.route('/debug/live-detection')
 def debug_live_detection():
     try:
-        event = get_event_with_cache(DEFAULT_CURRENT_EVENT_ID)
+        event = get_event_with_cache(current_event_id())
         debug_info = []
         debug_info.append(f"Event: {event.name}")
         debug_info.append(f"Status: {event.status}")
         
         # Cache status
-        global event_cache, last_check_time
         if last_check_time:
             cache_age = (datetime.now() - last_check_time).total_seconds()
             debug_info.append(f"Cache Last Updated: {last_check_time.strftime('%Y-%m-%d %H:%M:%S')}")
             debug_info.append(f"Cache Age: {round(cache_age)} seconds (expires at {CACHE_EXPIRY} seconds)")
         
-        # Controleer UFC.com rechtstreeks
+        # Controleer UFC.com via de gedeelde probe snapshot
         try:
-            response = requests.get("https://www.ufc.com/events", timeout=5)
-            if response.status_code == 200:
-                if "LIVE NOW" in response.text:
+            snapshot = live_probe.get_snapshot()
+            if snapshot.status_code == 200:
+                debug_info.append(f"UFC.com snapshot leeftijd: {round(time.time() - snapshot.checked_at)} seconden")
+                # Gedeelde extractie van deze paginaversie (zelfde parse als de live detectie)
+                page = snapshot.page
+                if page.has_live_marker:
                     debug_info.append("UFC.com toont 'LIVE NOW' indicator")
                 else:
                     debug_info.append("Geen 'LIVE NOW' indicator gevonden op UFC.com")
-                    
-                # Zoek specifieke HTML elementen
-                soup = BeautifulSoup(response.text, 'html.parser')
-                live_elements = soup.find_all(string=lambda text: text and 'live' in text.lower())
-                debug_info.append(f"Aantal elementen met 'live' tekst: {len(live_elements)}")
-                for i, elem in enumerate(live_elements[:5]):  # Toon eerste 5
-                    debug_info.append(f"  - Live element {i+1}: {elem.strip()}")
+                if page.live_event:
+                    debug_info.append(f"Live event op UFC.com: {page.live_event.headline} ({page.live_event.url})")
+                debug_info.append(f"Events op de pagina: {len(page.events)} (hash {page.content_hash[:12]})")
+                for card in page.events[:3]:
+                    debug_info.append(f"  - [{card.section or '?'}] {card.headline} {card.date_text}")
+
+                debug_info.append(f"Aantal elementen met 'live' tekst: {len(page.live_texts)}")
+                for i, text in enumerate(page.live_texts[:5]):  # Toon eerste 5
+                    debug_info.append(f"  - Live element {i+1}: {text}")
         except Exception as e:
             debug_info.append(f"Fout bij het controleren van UFC.com: {str(e)}")
         
@@ -382,7 +1274,7 @@ def debug_live_detection():
             debug_info.append(f"\nSegment: {segment.name}, Start: {segment.start_time}")
             
             for i, fight in enumerate(segment.fights):
-                fighter_names = [fs.fighter.name for fs in fight.fighters_stats]
+                fighter_names = fight.fighter_names
                 fighters_str = " vs. ".join(fighter_names)
                 
                 # Test de volledige detectielogica
@@ -412,17 +1304,17 @@ def debug_live_detection():
         logger.error(f"Fout in debug endpoint: {str(e)}")
         return f"Error in debug: {str(e)}"
 
-@app.route('/debug/simulate-live')
+@bp.route('/debug/simulate-live')
 def debug_simulate_live():
     # Simuleer live event detectie
     try:
-        event_id = DEFAULT_CURRENT_EVENT_ID
+        event_id = current_event_id()
         
         # Gebruik query parameter als die er is
         if request.args.get('event_id'):
             try:
                 event_id = int(request.args.get('event_id'))
-            except:
+            except ValueError:
                 pass
                 
         event = get_event_with_cache(event_id)
@@ -446,7 +1338,7 @@ def debug_simulate_live():
             debug_info.append(f"\nSegment: {segment.name}")
             
             for i, fight in enumerate(segment.fights):
-                fighter_names = [fs.fighter.name for fs in fight.fighters_stats]
+                fighter_names = fight.fighter_names
                 fighters_str = " vs. ".join(fighter_names)
                 
                 # Voor gesimuleerde detectie, zoek naar een niet-afgemaakt gevecht
@@ -490,7 +1382,7 @@ def debug_simulate_live():
             for segment in event.card_segments:
                 for i, fight in enumerate(segment.fights):
                     if not (fight.result and fight.result.method):
-                        fighter_names = [fs.fighter.name for fs in fight.fighters_stats]
+                        fighter_names = fight.fighter_names
                         fighters_str = " vs. ".join(fighter_names)
                         no_result_fights.append((segment.name, i, fighters_str))
             
@@ -522,5 +1414,6 @@ def debug_simulate_live():
         return f"Error in simulation: {str(e)}"
 
 if __name__ == "__main__":
+    from . import create_app
     port = int(os.environ.get("PORT", 5000))
-    app.run(host='0.0.0.0', port=port)
+    create_app().run(host='0.0.0.0', port=port)
@@ -0,0 +1,115 @@
+"""Cache van gerenderde response bodies per event versie, met ETag en voorgecomprimeerde varianten"""
+import gzip
+import hashlib
+import threading
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # brotli is optioneel
+    brotli = None
+
+
+# Achtervoegsel van de ETag per Content-Encoding: een sterke ETag hoort bij
+# precies één reeks bytes, dus elke gecomprimeerde variant krijgt zijn eigen ETag
+ETAG_SUFFIXES = {None: '', 'gzip': '-gz', 'br': '-br'}
+
+
+class RenderedResponse:
+    """Een eenmaal gerenderde body met sterke ETag; gecomprimeerde varianten worden lazy gemaakt"""
+
+    __slots__ = ('body', 'mimetype', 'etag', '_variants', '_lock')
+
+    def __init__(self, body, mimetype):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.sha1(body).hexdigest()
+        self._variants = {}
+        self._lock = threading.Lock()
+
+    def etag_for(self, encoding):
+        """Sterke ETag van de variant voor een Content-Encoding"""
+        return self.etag + ETAG_SUFFIXES[encoding]
+
+    def variant(self, encoding):
+        """Body voor een Content-Encoding ('br', 'gzip' of None), hoogstens één keer gecomprimeerd"""
+        if encoding is None:
+            return self.body
+        with self._lock:
+            data = self._variants.get(encoding)
+            if data is None:
+                if encoding == 'br':
+                    data = brotli.compress(self.body)
+                else:
+                    data = gzip.compress(self.body, compresslevel=6)
+                self._variants[encoding] = data
+            return data
+
+
+def choose_encoding(accept_encodings, body_size, min_size=512):
+    """Kies de beste door de client geaccepteerde compressie"""
+    if body_size < min_size:
+        return None
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def make_cached_response(rendered, vary='Accept-Encoding'):
+    """Bouw een Flask response; 304 als de client deze versie al heeft (in welke encoding dan ook)"""
+    encoding = choose_encoding(request.accept_encodings, len(rendered.body))
+    etag = rendered.etag_for(encoding)
+    if any(request.if_none_match.contains(rendered.etag_for(known)) for known in ETAG_SUFFIXES):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.headers['Vary'] = vary
+        return response
+
+    response = Response(rendered.variant(encoding), mimetype=rendered.mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Vary'] = vary
+    response.headers['Cache-Control'] = 'public, no-cache'
+    return response
+
+
+class ResponseCache:
+    """
+    Bewaart per sleutel (bv. ('event', 1251)) de laatst gerenderde response
+    samen met de versie waarvoor die gerenderd is. Een versie is het event
+    object plus een extra sleutel (zoals de live status van de gevechten).
+    """
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.renders = 0
+
+    def get_or_render(self, key, event, extra, render):
+        with self._lock:
+            entry = self._entries.get(key)
+            # Events zijn snapshots: == vergelijkt alleen de content hashes
+            if entry is not None and entry[0] == event and entry[1] == extra:
+                self.hits += 1
+                return entry[2]
+        rendered = render()
+        with self._lock:
+            self.renders += 1
+            self._entries.pop(key, None)
+            self._entries[key] = (event, extra, rendered)
+            while len(self._entries) > self.max_entries:
+                # Verwijder de oudste entry (dicts behouden invoegvolgorde)
+                del self._entries[next(iter(self._entries))]
+        return rendered
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "renders": self.renders}
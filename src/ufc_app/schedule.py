@@ -0,0 +1,137 @@
+"""
+Tijdlijn van het vorige, huidige en volgende event.
+
+De event kaarten komen uit de (al gecachte) extractie van de UFC.com events
+pagina; get_event_fmid zet de event URLs om naar fmids. Een URL hoort altijd
+bij hetzelfde fmid, dus die omzetting wordt per URL onthouden. De tijdlijn
+wordt op een eigen, trage cadans op de achtergrond ververst; tot de eerste
+succesvolle verversing gelden de meegegeven standaard IDs.
+"""
+from collections import namedtuple
+import logging
+import threading
+import time
+from urllib.parse import urljoin
+
+logger = logging.getLogger('ufc_app')
+
+Schedule = namedtuple('Schedule', ['last', 'current', 'next', 'live', 'resolved_at', 'source'])
+
+
+def pick_event_cards(page):
+    """(vorig, huidig, volgend) event kaart van de events pagina; ontbrekende zijn None"""
+    upcoming = [card for card in page.events if card.section == 'upcoming' and card.url]
+    past = [card for card in page.events if card.section == 'past' and card.url]
+    live = page.live_event if page.live_event and page.live_event.url else None
+    # Het live event, anders het eerstvolgende event
+    current = live or (upcoming[0] if upcoming else None)
+    current_url = current.url if current else None
+    following = [card for card in upcoming if card.url != current_url]
+    last = next((card for card in past if card.url != current_url), None)
+    return last, current, following[0] if following else None
+
+
+class ScheduleResolver:
+    """
+    Houdt de tijdlijn bij. get() wacht nooit: een verouderde tijdlijn wordt
+    teruggegeven terwijl een achtergrondthread hem ververst (zoals de live probe).
+    """
+
+    def __init__(self, probe, resolve_fmid, defaults, interval=900, retry_interval=60, on_change=None):
+        self.probe = probe
+        self.resolve_fmid = resolve_fmid
+        self.interval = interval
+        self.retry_interval = retry_interval
+        self.on_change = on_change
+        last, current, following = defaults
+        self._schedule = Schedule(last, current, following, False, None, "defaults")
+        self._fmids = {}  # event URL -> fmid
+        self._next_refresh = 0
+        self._refresh_lock = threading.Lock()
+        self._stats = {"refreshes": 0, "failures": 0, "changes": 0, "fmid_lookups": 0}
+        self.last_error = None
+
+    def get(self):
+        """De huidige tijdlijn; start een verversing als die aan de beurt is"""
+        if time.time() >= self._next_refresh:
+            self._refresh_in_background()
+        return self._schedule
+
+    def _refresh_in_background(self):
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+
+        def refresh():
+            try:
+                self._refresh()
+            finally:
+                self._refresh_lock.release()
+
+        threading.Thread(target=refresh, name='ufc-schedule', daemon=True).start()
+
+    def refresh(self):
+        """Ververs direct (blokkerend); geeft de nieuwe tijdlijn terug"""
+        with self._refresh_lock:
+            self._refresh()
+        return self._schedule
+
+    def _fmid(self, card):
+        if card is None:
+            return None
+        url = urljoin(self.probe.url, card.url)
+        fmid = self._fmids.get(url)
+        if fmid is None:
+            self._stats["fmid_lookups"] += 1
+            fmid = int(self.resolve_fmid(url))
+            self._fmids[url] = fmid
+        return fmid
+
+    def _refresh(self):
+        previous = self._schedule
+        try:
+            snapshot = self.probe.get_snapshot()
+            page = snapshot.page if snapshot is not None else None
+            if page is None:
+                raise ValueError("UFC.com events pagina niet beschikbaar")
+            last, current, following = pick_event_cards(page)
+            if current is None:
+                raise ValueError("Geen huidig of komend event op de events pagina")
+            schedule = Schedule(
+                last=self._fmid(last) or previous.last,
+                current=self._fmid(current),
+                next=self._fmid(following) or previous.next,
+                live=current is page.live_event,
+                resolved_at=time.time(),
+                source=current.url,
+            )
+        except Exception as e:
+            self._stats["failures"] += 1
+            self.last_error = str(e)
+            self._next_refresh = time.time() + self.retry_interval
+            logger.warning(f"Event schema niet ververst: {str(e)}, nieuwe poging over {self.retry_interval}s")
+            return
+
+        self._stats["refreshes"] += 1
+        self.last_error = None
+        self._next_refresh = time.time() + self.interval
+        self._schedule = schedule
+        if schedule[:3] != previous[:3]:
+            self._stats["changes"] += 1
+            logger.info(f"Event schema: vorig {schedule.last}, huidig {schedule.current}, volgend {schedule.next}")
+            if self.on_change:
+                self.on_change(previous, schedule)
+
+    def stats(self):
+        schedule = self._schedule
+        stats = dict(self._stats)
+        stats.update({
+            "last_event_id": schedule.last,
+            "current_event_id": schedule.current,
+            "next_event_id": schedule.next,
+            "current_is_live": schedule.live,
+            "source": schedule.source,
+            "age_seconds": round(time.time() - schedule.resolved_at) if schedule.resolved_at else None,
+            "interval_seconds": self.interval,
+            "last_error": self.last_error,
+        })
+        return stats
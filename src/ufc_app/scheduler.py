@@ -0,0 +1,140 @@
+"""Adaptieve planning van achtergrond verversingen per event"""
+from datetime import datetime
+import os
+import random
+import threading
+import time
+
+import pytz
+
+# Verversingsintervallen in seconden, afhankelijk van de toestand van het event
+INTERVAL_LIVE = int(os.environ.get('REFRESH_INTERVAL_LIVE', 15))            # Event bezig / gevecht live
+INTERVAL_STARTING = int(os.environ.get('REFRESH_INTERVAL_STARTING', 60))    # Eerste segment binnen een uur
+INTERVAL_SAME_DAY = int(os.environ.get('REFRESH_INTERVAL_SAME_DAY', 300))   # Eerste segment binnen 24 uur
+INTERVAL_UPCOMING = int(os.environ.get('REFRESH_INTERVAL_UPCOMING', 3600))  # Verder in de toekomst
+INTERVAL_FINAL = int(os.environ.get('REFRESH_INTERVAL_FINAL', 6 * 3600))    # Event is afgelopen
+INTERVAL_DEFAULT = 300
+
+JITTER = 0.1            # +/- 10% spreiding zodat workers/events niet synchroon lopen
+BACKOFF_BASE = 30       # Eerste wachttijd na een fout
+BACKOFF_MAX = 1800      # Maximale wachttijd na herhaalde fouten
+
+
+def _all_fights_finished(event):
+    for segment in event.card_segments:
+        for fight in segment.fights:
+            if not (fight.result and fight.result.method):
+                return False
+    return True
+
+
+def compute_refresh_interval(event, live_detected=False, now=None):
+    """
+    Bepaal hoe snel een event opnieuw opgehaald moet worden:
+    seconden tijdens een live event, minuten vlak voor de start,
+    uren als het event afgelopen is of nog ver weg ligt.
+    """
+    if live_detected or event.status == "In Progress":
+        return INTERVAL_LIVE
+
+    if event.status == "Final" or (event.card_segments and _all_fights_finished(event)):
+        return INTERVAL_FINAL
+
+    now = now or datetime.now(pytz.UTC)
+    start_times = [s.start_time for s in event.card_segments if s.start_time]
+    if not start_times:
+        return INTERVAL_DEFAULT
+
+    seconds_until_start = (min(start_times) - now).total_seconds()
+    if seconds_until_start <= 0:
+        # Gestart volgens schema maar nog niet als "In Progress" gemeld
+        return INTERVAL_LIVE
+    if seconds_until_start <= 3600:
+        return INTERVAL_STARTING
+    if seconds_until_start <= 24 * 3600:
+        return INTERVAL_SAME_DAY
+    return INTERVAL_UPCOMING
+
+
+def with_jitter(interval):
+    return interval * random.uniform(1 - JITTER, 1 + JITTER)
+
+
+class RefreshScheduler:
+    """Houdt per event bij wanneer de volgende verversing moet plaatsvinden"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_due = {}
+        self._intervals = {}
+        self._failures = {}
+        self._running = set()
+        self.lag_seconds = 0.0  # Hoe ver de laatst gestarte verversingen achter liepen op schema
+
+    def is_scheduled(self, event_id):
+        with self._lock:
+            return event_id in self._next_due
+
+    def ensure(self, event_id, due=None):
+        """Nieuwe events worden ingepland op `due` (bv. als de cache nog vers is), anders direct"""
+        with self._lock:
+            self._next_due.setdefault(event_id, due or time.time())
+
+    def forget(self, event_id):
+        with self._lock:
+            self._running.discard(event_id)
+            self._next_due.pop(event_id, None)
+            self._intervals.pop(event_id, None)
+            self._failures.pop(event_id, None)
+
+    def take_due(self, now=None):
+        """Geef alle events die aan de beurt zijn en markeer ze als bezig"""
+        now = now or time.time()
+        with self._lock:
+            due = [k for k, t in self._next_due.items() if t <= now and k not in self._running]
+            if due:
+                self.lag_seconds = max(now - self._next_due[k] for k in due)
+            self._running.update(due)
+            return due
+
+    def record_success(self, event_id, interval):
+        with self._lock:
+            self._running.discard(event_id)
+            self._failures.pop(event_id, None)
+            self._intervals[event_id] = interval
+            self._next_due[event_id] = time.time() + with_jitter(interval)
+
+    def record_failure(self, event_id):
+        """Exponentiële backoff bij scrape fouten"""
+        with self._lock:
+            self._running.discard(event_id)
+            failures = self._failures.get(event_id, 0) + 1
+            self._failures[event_id] = failures
+            delay = min(BACKOFF_BASE * (2 ** (failures - 1)), BACKOFF_MAX)
+            self._next_due[event_id] = time.time() + with_jitter(delay)
+            return delay
+
+    def defer(self, event_id, delay):
+        with self._lock:
+            self._running.discard(event_id)
+            self._next_due[event_id] = time.time() + delay
+
+    def seconds_until_next(self, default):
+        with self._lock:
+            pending = [t for k, t in self._next_due.items() if k not in self._running]
+        if not pending:
+            return default
+        return max(0.0, min(pending) - time.time())
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            return {
+                str(event_id): {
+                    "next_refresh_in_seconds": round(due - now),
+                    "interval_seconds": self._intervals.get(event_id),
+                    "consecutive_failures": self._failures.get(event_id, 0),
+                    "running": event_id in self._running,
+                }
+                for event_id, due in self._next_due.items()
+            }
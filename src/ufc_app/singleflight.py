@@ -0,0 +1,129 @@
+"""Single-flight coalescing: hoogstens één lopende aanroep per sleutel"""
+from collections import OrderedDict
+from concurrent.futures import Future
+import threading
+import time
+
+_MISSING = object()
+
+
+class SingleFlight:
+    """
+    Zorgt dat gelijktijdige aanroepen voor dezelfde sleutel samengevoegd worden.
+    De eerste aanroeper (leader) voert de functie uit; alle andere aanroepers
+    wachten op dezelfde Future of krijgen direct een meegegeven verouderde waarde.
+
+    Sleutels komen uit URLs, dus per-sleutel statistieken worden alleen voor
+    de `max_keys` meest recente sleutels bewaard; de totalen tellen alles.
+    """
+
+    def __init__(self, max_keys=64):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = OrderedDict()
+        self._totals = self._new_stats()
+
+    @staticmethod
+    def _new_stats():
+        return {
+            "calls": 0,
+            "executions": 0,
+            "coalesced": 0,
+            "stale_served": 0,
+            "total_wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+            "last_duration_seconds": None,
+        }
+
+    def _key_stats(self, key):
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = self._new_stats()
+            # Oudste sleutels zonder lopende aanroep vergeten
+            excess = len(self._stats) - self.max_keys
+            if excess > 0:
+                for old in [k for k in self._stats if k not in self._calls][:excess]:
+                    del self._stats[old]
+        else:
+            self._stats.move_to_end(key)
+        return stats
+
+    def _count(self, stats, field, amount=1):
+        stats[field] += amount
+        self._totals[field] += amount
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key, fn, stale=_MISSING):
+        """
+        Voer fn() uit voor deze sleutel, of sluit aan bij een lopende aanroep.
+        Als er al een aanroep loopt en `stale` is meegegeven, wordt die waarde
+        direct teruggegeven in plaats van te wachten.
+        """
+        with self._lock:
+            stats = self._key_stats(key)
+            self._count(stats, "calls")
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self._count(stats, "executions")
+            else:
+                self._count(stats, "coalesced")
+                if stale is not _MISSING:
+                    self._count(stats, "stale_served")
+                    return stale
+
+        if leader:
+            start = time.monotonic()
+            try:
+                result = fn()
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            else:
+                future.set_result(result)
+                return result
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                    duration = round(time.monotonic() - start, 3)
+                    stats["last_duration_seconds"] = self._totals["last_duration_seconds"] = duration
+
+        start = time.monotonic()
+        try:
+            return future.result()
+        finally:
+            waited = time.monotonic() - start
+            with self._lock:
+                self._count(stats, "total_wait_seconds", waited)
+                stats["max_wait_seconds"] = max(stats["max_wait_seconds"], waited)
+                self._totals["max_wait_seconds"] = max(self._totals["max_wait_seconds"], waited)
+
+    @staticmethod
+    def _rounded(stats):
+        item = dict(stats)
+        item["total_wait_seconds"] = round(item["total_wait_seconds"], 3)
+        item["max_wait_seconds"] = round(item["max_wait_seconds"], 3)
+        return item
+
+    def totals(self):
+        """Totalen over alle sleutels (ook vergeten sleutels)"""
+        with self._lock:
+            totals = self._rounded(self._totals)
+            totals["in_flight"] = len(self._calls)
+            return totals
+
+    def stats(self):
+        """Totalen plus statistieken van de meest recente sleutels voor /api/status"""
+        with self._lock:
+            keys = {}
+            for key, stats in self._stats.items():
+                item = self._rounded(stats)
+                item["in_flight"] = key in self._calls
+                keys[str(key)] = item
+        return {"totals": self.totals(), "keys": keys}
@@ -0,0 +1,69 @@
+"""
+Compact, onveranderlijk snapshot model van een gescraped event.
+
+De scraper levert volledige objecten met veel velden die deze app nooit
+serveert. Bij binnenkomst in de cache wordt een event één keer omgezet naar
+tuple-gebaseerde records met alleen de velden die de endpoints gebruiken;
+de namen van de fighters staan per gevecht al klaar. Elk snapshot draagt een
+content hash, zodat "is er iets veranderd?" een vergelijking van twee strings is.
+"""
+from collections import namedtuple
+import hashlib
+
+Fighter = namedtuple('Fighter', ['name', 'url'])
+FightResult = namedtuple('FightResult', ['method', 'ending_round', 'ending_time'])
+Fight = namedtuple('Fight', ['fighter_names', 'fighters', 'result'])
+Segment = namedtuple('Segment', ['name', 'start_time', 'fights'])
+
+
+class EventSnapshot:
+    """Event met segmenten en gevechten; gelijk als de content hash gelijk is"""
+
+    __slots__ = ('name', 'status', 'card_segments', 'content_hash')
+
+    def __init__(self, name, status, card_segments, content_hash=None):
+        if content_hash is None:
+            content_hash = hashlib.sha1(repr((name, status, card_segments)).encode('utf-8')).hexdigest()
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'status', status)
+        object.__setattr__(self, 'card_segments', card_segments)
+        object.__setattr__(self, 'content_hash', content_hash)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("EventSnapshot is onveranderlijk")
+
+    def __eq__(self, other):
+        if not isinstance(other, EventSnapshot):
+            return NotImplemented
+        return self.content_hash == other.content_hash
+
+    def __hash__(self):
+        return hash(self.content_hash)
+
+    def __reduce__(self):
+        # De hash gaat mee, zodat een unpickle (cache backend, snapshot, archief) niets herberekent
+        return (EventSnapshot, (self.name, self.status, self.card_segments, self.content_hash))
+
+    def __repr__(self):
+        return f"EventSnapshot({self.name!r}, {self.status!r}, {self.content_hash[:12]})"
+
+
+def _fight_snapshot(fight):
+    fighters = tuple(
+        Fighter(fs.fighter.name, getattr(fs.fighter, 'url', None)) for fs in fight.fighters_stats
+    )
+    result = fight.result
+    if result:
+        result = FightResult(result.method, result.ending_round, result.ending_time)
+    return Fight(tuple(f.name for f in fighters), fighters, result or None)
+
+
+def to_snapshot(event):
+    """Zet een scraper event om naar een EventSnapshot (een snapshot blijft ongewijzigd)"""
+    if isinstance(event, EventSnapshot):
+        return event
+    segments = tuple(
+        Segment(segment.name, segment.start_time, tuple(_fight_snapshot(f) for f in segment.fights))
+        for segment in event.card_segments
+    )
+    return EventSnapshot(event.name, event.status, segments)
@@ -0,0 +1,68 @@
+"""
+Locaties van de bestanden die de app zelf schrijft en later weer inleest: de
+cache snapshot, de sqlite cache, het archief, de leader lock en de socket van
+de cache daemon.
+
+De meeste bevatten gepickelde events, en pickle.loads op een bestand dat een
+andere lokale gebruiker kan neerzetten is code-executie in de app. Daarom
+staan ze standaard in een eigen map die alleen voor de eigenaar toegankelijk
+is ($XDG_CACHE_HOME/ufc_app, anders ~/.cache/ufc_app), en wordt een bestand
+pas gelezen als het van deze gebruiker is en niemand anders erin kan schrijven.
+"""
+import os
+import stat
+
+APP_DIR_NAME = 'ufc_app'
+
+
+class UnsafeFileError(PermissionError):
+    """Het bestand (of de map erom) kan door een andere gebruiker geplaatst of aangepast zijn"""
+
+
+def data_dir():
+    """De map voor de bestanden van de app; wordt aangemaakt met rechten 0700"""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    path = os.path.join(base, APP_DIR_NAME)
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    return path
+
+
+def default_path(filename):
+    return os.path.join(data_dir(), filename)
+
+
+def env_path(name, filename):
+    """Pad uit omgevingsvariabele `name` (een lege waarde blijft leeg), anders in de data map"""
+    value = os.environ.get(name)
+    return value if value is not None else default_path(filename)
+
+
+def check_private(path):
+    """
+    UnsafeFileError tenzij `path` van deze gebruiker is en niet door groep of
+    anderen beschreven kan worden. De map erom moet van deze gebruiker of root
+    zijn; een map waarin anderen mogen schrijven (zoals /tmp) alleen met sticky
+    bit, zodat niemand anders ons bestand kan vervangen.
+    """
+    if not hasattr(os, 'getuid'):  # Geen POSIX rechten (Windows)
+        return
+    uid = os.getuid()
+    info = os.stat(path)
+    if info.st_uid != uid:
+        raise UnsafeFileError(f"{path} is van uid {info.st_uid}, niet van deze gebruiker (uid {uid})")
+    if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise UnsafeFileError(f"{path} is beschrijfbaar voor groep of anderen")
+    directory = os.path.dirname(os.path.abspath(path))
+    info = os.stat(directory)
+    if info.st_uid not in (uid, 0):
+        raise UnsafeFileError(f"Map {directory} is van uid {info.st_uid}")
+    if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH) and not info.st_mode & stat.S_ISVTX:
+        raise UnsafeFileError(f"Map {directory} is beschrijfbaar voor anderen zonder sticky bit")
+
+
+def check_private_sqlite(path):
+    """check_private voor een sqlite database plus zijn WAL bestanden (als die bestaan)"""
+    check_private(path)
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            check_private(path + suffix)
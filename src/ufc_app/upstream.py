@@ -0,0 +1,240 @@
+"""
+Gedeelde HTTP laag naar de upstream (UFC.com en de scraper).
+
+- Eén requests.Session per upstream met een HTTPAdapter pool (keep-alive),
+  zodat niet elke aanroep een nieuwe TCP+TLS handshake kost
+- Een circuit breaker per upstream: na een reeks fouten faalt een aanroep
+  direct (CircuitOpenError), zodat de aanroeper de cache kan serveren in
+  plaats van telkens de volle timeout af te wachten
+- Eén globaal retry budget: retries mogen hoogstens een fractie van alle
+  aanroepen uitmaken, met exponentiële backoff en jitter
+"""
+import logging
+import random
+import sys
+import threading
+import time
+
+logger = logging.getLogger('ufc_app')
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}  # Voor de Prometheus gauge
+
+
+class CircuitOpenError(Exception):
+    """De upstream wordt als ongezond beschouwd; de aanroep is niet uitgevoerd"""
+
+
+class CircuitBreaker:
+    """
+    Closed: alles gaat door. Na `failure_threshold` opeenvolgende fouten gaat de
+    breaker open en faalt elke aanroep direct. Na `reset_timeout` seconden mag
+    één proefaanroep door (half open); slaagt die, dan sluit de breaker weer.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._stats = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and time.time() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """True als er een aanroep door mag; in half open hoogstens één tegelijk"""
+        with self._lock:
+            if self._state == OPEN and time.time() - self._opened_at >= self.reset_timeout:
+                self._state = HALF_OPEN
+            if self._state == CLOSED:
+                self._stats["calls"] += 1
+                return True
+            if self._state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                self._stats["calls"] += 1
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info(f"Circuit breaker {self.name} weer gesloten")
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def record_ignored(self):
+        """De aanroep faalde om een reden die niet aan de upstream ligt: geef de proefaanroep vrij"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._stats["failures"] += 1
+            self._failures += 1
+            self._trial_running = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self._stats["opened"] += 1
+                    logger.warning(f"Circuit breaker {self.name} open na {self._failures} fout(en)")
+                self._state = OPEN
+                self._opened_at = time.time()
+
+    def stats(self):
+        state = self.state
+        with self._lock:
+            stats = dict(self._stats)
+            stats["state"] = state
+            stats["consecutive_failures"] = self._failures
+            stats["retry_in_seconds"] = (
+                max(0, round(self.reset_timeout - (time.time() - self._opened_at), 1))
+                if state == OPEN else None
+            )
+        return stats
+
+
+class RetryBudget:
+    """
+    Token bucket voor retries: elke aanroep stort `ratio` tokens, elke retry
+    kost één token. Zo blijven retries beperkt tot ~ratio van het verkeer en
+    verergeren ze een storing niet. `min_tokens` laat bij weinig verkeer toch
+    een paar retries toe.
+    """
+
+    def __init__(self, ratio=0.1, min_tokens=3, max_tokens=20):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = float(min_tokens)
+        self._min_tokens = min_tokens
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.denied = 0
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self):
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self.retries += 1
+                return True
+            self.denied += 1
+            return False
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tokens": round(self._tokens, 2),
+                "ratio": self.ratio,
+                "retries": self.retries,
+                "denied": self.denied,
+            }
+
+
+def backoff_delay(attempt, base=0.2, cap=2.0):
+    """Exponentiële backoff met volledige jitter"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class UpstreamError(Exception):
+    """Een upstream response die als fout telt (5xx)"""
+
+
+def is_upstream_failure(exc):
+    """
+    Alleen transport-, timeout- en 5xx fouten zeggen iets over de gezondheid van
+    de upstream. Andere fouten (bv. een onbekend event of een onbekende fighter)
+    falen elke keer opnieuw en mogen de breaker niet openen.
+    """
+    if isinstance(exc, UpstreamError):
+        return True
+    requests = sys.modules.get('requests')  # Niet geïmporteerd: dan ook geen requests fout
+    return requests is not None and isinstance(exc, requests.RequestException)
+
+
+class UpstreamClient:
+    """Breaker, retry budget en (voor HTTP) een gepoolde session voor één upstream"""
+
+    def __init__(self, name, budget, retries=1, timeout=5, pool_size=10,
+                 failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.budget = budget
+        self.retries = retries
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """requests.Session met een connectie pool; requests wordt pas bij gebruik geïmporteerd"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.pool_size)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+
+    @session.setter
+    def session(self, value):
+        self._session = value
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Voer fn uit achter de breaker. Upstream fouten worden opnieuw geprobeerd
+        zolang het globale retry budget dat toelaat; een open breaker faalt direct.
+        Andere fouten worden ongewijzigd doorgegeven zonder als fout te tellen.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Upstream {self.name} is tijdelijk niet beschikbaar (circuit open)")
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not is_upstream_failure(e):
+                    self.breaker.record_ignored()
+                    raise
+                if attempt < self.retries and self.budget.try_spend():
+                    delay = backoff_delay(attempt)
+                    logger.info(f"Upstream {self.name} fout ({str(e)}), nieuwe poging over {delay:.2f}s")
+                    attempt += 1
+                    time.sleep(delay)
+                    continue
+                self.breaker.record_failure()
+                raise
+            self.breaker.record_success()
+            return result
+
+    def get(self, url, headers=None, timeout=None):
+        """GET via de gedeelde session; 5xx telt als fout (en wordt eventueel herhaald)"""
+        def request():
+            response = self.session.get(url, headers=headers or {}, timeout=timeout or self.timeout)
+            if response.status_code >= 500:
+                raise UpstreamError(f"{url} gaf status {response.status_code}")
+            return response
+        return self.call(request)
+
+    def stats(self):
+        return self.breaker.stats()
@@ -0,0 +1,56 @@
+"""Snapshot van de event cache op schijf, zodat een herstart of deploy warm begint"""
+import logging
+import os
+import pickle
+import tempfile
+import time
+import zlib
+
+from .storage import check_private
+
+logger = logging.getLogger('ufc_app')
+
+SNAPSHOT_FORMAT = 1
+
+
+def save_snapshot(path, items):
+    """
+    Schrijf (event_id, fetched_at, event) entries gecomprimeerd naar `path`.
+    Er wordt eerst naar een tijdelijk bestand geschreven en daarna atomisch
+    vervangen, zodat een lezer nooit een half bestand ziet.
+    """
+    entries = [(event_id, fetched_at.timestamp(), event) for event_id, (fetched_at, event) in items]
+    payload = zlib.compress(
+        pickle.dumps((SNAPSHOT_FORMAT, time.time(), entries), protocol=pickle.HIGHEST_PROTOCOL), 6)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.ufc-snapshot-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return len(payload)
+
+
+def load_snapshot(path, max_age):
+    """
+    Lees een snapshot; geeft een lijst (event_id, fetched_at_timestamp, event) terug.
+    Ontbrekende, kapotte of te oude snapshots leveren een lege lijst op, net als
+    een snapshot dat niet van deze gebruiker is (pickle.loads voert code uit).
+    """
+    try:
+        check_private(path)
+        with open(path, 'rb') as f:
+            version, written_at, entries = pickle.loads(zlib.decompress(f.read()))
+    except FileNotFoundError:
+        return []
+    except Exception as e:
+        logger.warning(f"Cache snapshot {path} kon niet gelezen worden: {str(e)}")
+        return []
+    if version != SNAPSHOT_FORMAT:
+        return []
+    cutoff = time.time() - max_age
+    return [entry for entry in entries if entry[1] >= cutoff]